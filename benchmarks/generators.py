@@ -0,0 +1,160 @@
+import numpy as np
+
+
+def zipf_corpus(num_texts, vocabulary_size=5000, text_length=50,
+                num_templates=None, seed=0):
+    """
+    Generates texts of Zipf-distributed words.
+
+    Texts are noisy copies of a smaller set of template texts, so some of
+    them are near-duplicates (as expected by SimHash and LSH).
+
+    :param num_texts: the number of texts to generate
+    :param vocabulary_size: the number of distinct words
+    :param text_length: the number of words per text
+    :param num_templates: the number of template texts (default: half)
+    :param seed: the random seed
+    :return: a list of texts with space-separated words
+    """
+    rng = np.random.default_rng(seed)
+    num_templates = num_templates or max(num_texts // 2, 1)
+
+    words = np.minimum(rng.zipf(1.3, size=(num_templates, text_length)),
+                       vocabulary_size)
+    texts = words[rng.integers(0, num_templates, size=num_texts)]
+
+    # replace about 10% of the words of every text
+    noise = rng.random(texts.shape) < 0.1
+    texts = np.where(noise, rng.integers(1, vocabulary_size, texts.shape),
+                     texts)
+
+    return [' '.join(f'w{w}' for w in text) for text in texts.tolist()]
+
+
+def zipf_baskets(num_baskets, num_items=1000, mean_basket_size=8, seed=0):
+    """
+    Generates market baskets of Zipf-distributed items.
+
+    :param num_baskets: the number of baskets to generate
+    :param num_items: the number of distinct items
+    :param mean_basket_size: the mean number of items per basket
+    :param seed: the random seed
+    :return: a list of basket lines with space-separated sorted item ids
+    """
+    rng = np.random.default_rng(seed)
+    sizes = np.maximum(rng.poisson(mean_basket_size, num_baskets), 1)
+
+    baskets = []
+    for size in sizes.tolist():
+        items = np.unique(np.minimum(rng.zipf(1.5, size), num_items))
+        baskets.append(' '.join(map(str, items.tolist())))
+
+    return baskets
+
+
+def sparse_ratings(num_items, num_users, density=0.1, seed=0):
+    """
+    Generates a sparse matrix of 1-5 ratings from latent item and user
+    factors.
+
+    :param num_items: the number of items (rows)
+    :param num_users: the number of users (columns)
+    :param density: the fraction of given ratings
+    :param seed: the random seed
+    :return: a num_items x num_users int matrix with 0 for missing ratings
+    """
+    rng = np.random.default_rng(seed)
+    item_factors = rng.normal(size=(num_items, 4))
+    user_factors = rng.normal(size=(num_users, 4))
+
+    scores = item_factors @ user_factors.T
+    ratings = np.clip(np.round(3 + scores), 1, 5).astype(int)
+
+    # every item and user gets at least two ratings
+    given = rng.random((num_items, num_users)) < density
+    given[np.arange(num_items), rng.integers(0, num_users, num_items)] = True
+    given[np.arange(num_items), rng.integers(0, num_users, num_items)] = True
+    given[rng.integers(0, num_items, num_users), np.arange(num_users)] = True
+    given[rng.integers(0, num_items, num_users), np.arange(num_users)] = True
+
+    return np.where(given, ratings, 0)
+
+
+def power_law_graph(num_nodes, edges_per_node=2, seed=0):
+    """
+    Generates an undirected power-law graph by preferential attachment
+    (the Barabasi-Albert model).
+
+    :param num_nodes: the number of nodes
+    :param edges_per_node: the number of edges added with every new node
+    :param seed: the random seed
+    :return: a (num_edges, 2) array of distinct node pairs
+    """
+    rng = np.random.default_rng(seed)
+    edges_per_node = min(edges_per_node, num_nodes - 1)
+
+    # endpoints of all edges so far, sampled for preferential attachment
+    endpoints = list(range(edges_per_node + 1))
+    edges = [(i, j) for i in range(edges_per_node + 1)
+             for j in range(i + 1, edges_per_node + 1)]
+
+    for node in range(edges_per_node + 1, num_nodes):
+        targets = set()
+        while len(targets) < edges_per_node:
+            targets.add(endpoints[rng.integers(len(endpoints))])
+
+        for target in targets:
+            edges.append((target, node))
+            endpoints += [target, node]
+
+    return np.array(edges, dtype=np.int64).reshape(-1, 2)
+
+
+def node_colors(num_nodes, black_fraction=0.05, seed=0):
+    """
+    Generates node colors.
+
+    :param num_nodes: the number of nodes
+    :param black_fraction: the probability of a node being black
+    :param seed: the random seed
+    :return: a set of black node ids
+    """
+    rng = np.random.default_rng(seed)
+
+    return set(np.flatnonzero(rng.random(num_nodes) < black_fraction).tolist())
+
+
+def node_properties(num_nodes, num_properties=5, num_values=3, seed=0):
+    """
+    Generates node property vectors.
+
+    :param num_nodes: the number of nodes
+    :param num_properties: the length of the property vectors
+    :param num_values: the number of distinct property values
+    :param seed: the random seed
+    :return: a (num_nodes, num_properties) int array
+    """
+    rng = np.random.default_rng(seed)
+
+    return rng.integers(0, num_values, size=(num_nodes, num_properties))
+
+
+def bursty_bits(length, quiet_prob=0.02, burst_prob=0.8,
+                switch_prob=0.001, seed=0):
+    """
+    Generates a bursty bit stream from a two-state Markov chain.
+
+    :param length: the number of bits
+    :param quiet_prob: the probability of a 1 in the quiet state
+    :param burst_prob: the probability of a 1 in the burst state
+    :param switch_prob: the probability of switching states after a bit
+    :param seed: the random seed
+    :return: a uint8 array of bits
+    """
+    rng = np.random.default_rng(seed)
+
+    switches = rng.random(length) < switch_prob
+    in_burst = (np.cumsum(switches) % 2).astype(bool)
+    probs = np.where(in_burst, burst_prob, quiet_prob)
+
+    return (rng.random(length) < probs).astype(np.uint8)
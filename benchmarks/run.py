@@ -0,0 +1,347 @@
+import argparse
+import json
+import os
+import platform
+import subprocess
+import sys
+import time
+import tracemalloc
+from collections import defaultdict
+
+import numpy as np
+from scipy.sparse import csc_matrix
+
+ROOT = os.path.join(os.path.dirname(os.path.abspath(__file__)), os.pardir)
+for directory in ('common', 'lab01', 'lab02', 'lab03', 'lab04', 'lab05',
+                  'lab06'):
+    sys.path.append(os.path.join(ROOT, directory))
+
+import fastio  # noqa: E402
+import generators  # noqa: E402
+import instrument  # noqa: E402
+from CF import CollaborativeFiltering  # noqa: E402
+from ClosestBlackNode import closest_black_node  # noqa: E402
+from DGIM import DGIM  # noqa: E402
+from GNAlgorithm import CompactGraph, girvan_newmann_compact  # noqa: E402
+from NodeRank import NodeRank  # noqa: E402
+from PCY import pcy  # noqa: E402
+from SimHash import simhash  # noqa: E402
+from SimHashBuckets import lsh  # noqa: E402
+
+
+class Benchmark:
+    """Models a benchmark of one algorithm over a sweep of input sizes."""
+
+    def __init__(self, name, unit, sizes, quick_sizes, setup, run):
+        """
+        Initializes a Benchmark instance.
+
+        :param name: the benchmark name
+        :param unit: the unit of the input size (used for throughput)
+        :param sizes: the input sizes of the full sweep
+        :param quick_sizes: the input sizes of the quick sweep
+        :param setup: a function (size, seed) -> state, not timed
+        :param run: a function (state) -> None, timed
+        """
+        self.name = name
+        self.unit = unit
+        self.sizes = sizes
+        self.quick_sizes = quick_sizes
+        self.setup = setup
+        self.run = run
+
+
+def setup_lsh(size, seed):
+    """Generates a Zipfian text corpus."""
+    return generators.zipf_corpus(size, seed=seed)
+
+
+def run_lsh(texts):
+    """Hashes the texts with SimHash and finds LSH candidates."""
+    lsh([simhash(text) for text in texts])
+
+
+def setup_pcy(size, seed):
+    """Generates Zipfian market baskets."""
+    return size, generators.zipf_baskets(size, seed=seed)
+
+
+def run_pcy(state):
+    """Runs PCY with a 1% support threshold."""
+    num_baskets, baskets = state
+    pcy(num_baskets, 1000, 0.01 * num_baskets, baskets)
+
+
+def setup_cf(size, seed):
+    """Generates a sparse rating matrix and random CF queries."""
+    num_users = max(size // 2, 2)
+    ratings = generators.sparse_ratings(size, num_users, seed=seed)
+
+    rng = np.random.default_rng(seed)
+    queries = np.column_stack([rng.integers(0, size, 200),
+                               rng.integers(0, num_users, 200),
+                               rng.integers(0, 2, 200),
+                               rng.integers(1, 10, 200)])
+
+    return ratings, queries.tolist()
+
+
+def run_cf(state):
+    """Builds the CF similarity matrices and answers the queries."""
+    ratings, queries = state
+    cf = CollaborativeFiltering(ratings, *ratings.shape)
+
+    # items without similar rated neighbours predict nan
+    with np.errstate(invalid='ignore'):
+        for item, user, mode, k in queries:
+            cf.predict_rating(item, user, k, mode)
+
+
+def run_cf_approximate(state):
+    """Builds the approximate CF similarity matrices and answers queries."""
+    ratings, queries = state
+    # the nearest neighbours in sparse ratings have similarities of ~0.15
+    cf = CollaborativeFiltering(ratings, *ratings.shape, approximate=True,
+                                threshold=0.1)
+
+    with np.errstate(invalid='ignore'):
+        for item, user, mode, k in queries:
+            cf.predict_rating(item, user, k, mode)
+
+
+def setup_closest_black_node(size, seed):
+    """Generates a power-law graph with randomly colored nodes."""
+    adj_matrix = defaultdict(list)
+
+    for node_1, node_2 in generators.power_law_graph(size, seed=seed).tolist():
+        adj_matrix[node_1].append(node_2)
+        adj_matrix[node_2].append(node_1)
+
+    return size, adj_matrix, generators.node_colors(size, seed=seed)
+
+
+def run_closest_black_node(state):
+    """Finds the closest black node of every node."""
+    num_nodes, adj_matrix, black_nodes = state
+
+    for node in range(num_nodes):
+        closest_black_node(node, adj_matrix, black_nodes)
+
+
+def setup_node_rank(size, seed):
+    """Generates the NodeRank M matrix of a power-law graph."""
+    edges = generators.power_law_graph(size, seed=seed)
+    sources = np.concatenate([edges[:, 0], edges[:, 1]])
+    targets = np.concatenate([edges[:, 1], edges[:, 0]])
+
+    # column i holds the links of node i, as built by parse_M
+    out_degrees = np.bincount(sources, minlength=size)
+    M = csc_matrix((1. / out_degrees[sources], (targets, sources)),
+                   shape=(size, size))
+
+    return size, M
+
+
+def run_node_rank(state):
+    """Runs at most 100 NodeRank iterations."""
+    num_nodes, M = state
+    NodeRank(num_nodes, 0.8, M).run(100)
+
+
+def setup_girvan_newmann(size, seed):
+    """Generates a weighted power-law CompactGraph."""
+    edges = generators.power_law_graph(size, seed=seed)
+    properties = generators.node_properties(size, seed=seed)
+
+    similarities = np.count_nonzero(
+        properties[edges[:, 0]] == properties[edges[:, 1]], axis=1)
+    weights = properties.shape[1] - similarities + 1
+
+    return CompactGraph(np.arange(size), edges, weights)
+
+
+def run_girvan_newmann(graph):
+    """Runs the Girvan-Newmann algorithm."""
+    girvan_newmann_compact(graph)
+
+
+def setup_dgim(size, seed):
+    """Generates a bursty bit stream and DGIM query sizes."""
+    rng = np.random.default_rng(seed)
+    window_size = max(size // 10, 1)
+
+    return (window_size, generators.bursty_bits(size, seed=seed),
+            rng.integers(1, window_size + 1, 1000).tolist())
+
+
+def run_dgim(state):
+    """Feeds the stream to DGIM in chunks interleaved with queries."""
+    window_size, bits, queries = state
+    dgim = DGIM(window_size)
+
+    # interleave updates in chunks with queries
+    for chunk_idx, chunk in enumerate(np.array_split(bits, len(queries))):
+        dgim.update_many(chunk)
+        dgim.count_ones(queries[chunk_idx])
+
+
+BENCHMARKS = [
+    Benchmark('lsh', 'texts', [1000, 2000, 4000, 8000], [250, 500],
+              setup_lsh, run_lsh),
+    Benchmark('pcy', 'baskets', [5000, 10000, 20000, 40000], [1000, 2000],
+              setup_pcy, run_pcy),
+    Benchmark('cf', 'items', [250, 500, 1000, 2000], [100, 200],
+              setup_cf, run_cf),
+    Benchmark('cf_approximate', 'items', [250, 500, 1000, 2000], [100, 200],
+              setup_cf, run_cf_approximate),
+    Benchmark('closest_black_node', 'nodes', [5000, 10000, 20000, 40000],
+              [1000, 2000], setup_closest_black_node, run_closest_black_node),
+    Benchmark('node_rank', 'nodes', [10000, 100000, 1000000], [1000, 10000],
+              setup_node_rank, run_node_rank),
+    Benchmark('girvan_newmann', 'nodes', [50, 100, 200], [30, 60],
+              setup_girvan_newmann, run_girvan_newmann),
+    Benchmark('dgim', 'bits', [100000, 1000000, 10000000], [10000, 100000],
+              setup_dgim, run_dgim),
+]
+
+
+def measure(benchmark, size, seed, repeats):
+    """
+    Measures one benchmark at one input size.
+
+    Wall time is the best of the timed repeats. Peak memory is measured in
+    a separate traced run, so tracing does not affect the timings. If
+    instrumentation is enabled, its report covers the timed repeats.
+
+    :return: a dict of results
+    """
+    state = benchmark.setup(size, seed)
+    wall_times = []
+    instrument.metrics.reset()
+
+    for _ in range(repeats):
+        start = time.perf_counter()
+        benchmark.run(state)
+        wall_times.append(time.perf_counter() - start)
+        fastio.stdout().flush()
+
+    report = instrument.metrics.report()
+
+    tracemalloc.start()
+    benchmark.run(state)
+    _, peak_memory = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    fastio.stdout().flush()
+
+    wall_time = min(wall_times)
+
+    result = {
+        'benchmark': benchmark.name,
+        'size': size,
+        'unit': benchmark.unit,
+        'seed': seed,
+        'repeats': repeats,
+        'wall_time': wall_time,
+        'wall_times': wall_times,
+        'peak_memory': peak_memory,
+        'throughput': size / wall_time if wall_time > 0 else None,
+    }
+
+    if instrument.metrics.enabled:
+        result['instrumentation'] = report
+
+    return result
+
+
+def environment():
+    """Returns a dict describing the commit and the machine."""
+    try:
+        commit = subprocess.run(['git', 'rev-parse', 'HEAD'], cwd=ROOT,
+                                capture_output=True, text=True,
+                                check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        commit = None
+
+    return {
+        'commit': commit,
+        'timestamp': time.strftime('%Y-%m-%dT%H:%M:%S%z'),
+        'python': platform.python_version(),
+        'numpy': np.__version__,
+        'platform': platform.platform(),
+        'processor': platform.processor(),
+    }
+
+
+def compare(baseline, results):
+    """Prints a table of speedups of results relative to baseline."""
+    baseline_times = {(r['benchmark'], r['size']): r['wall_time']
+                      for r in baseline['results']}
+
+    print(f'{"benchmark":<20} {"size":>10} {"baseline":>10} {"current":>10} '
+          f'{"speedup":>8}')
+
+    for result in results['results']:
+        key = result['benchmark'], result['size']
+        if key not in baseline_times:
+            continue
+
+        speedup = baseline_times[key] / result['wall_time']
+        print(f'{key[0]:<20} {key[1]:>10} {baseline_times[key]:>10.4f} '
+              f'{result["wall_time"]:>10.4f} {speedup:>7.2f}x')
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description='Runs the lab benchmarks on seeded synthetic data.')
+    parser.add_argument('--only', nargs='+', metavar='NAME',
+                        choices=[b.name for b in BENCHMARKS],
+                        help='run only the given benchmarks')
+    parser.add_argument('--quick', action='store_true',
+                        help='use the small input sizes')
+    parser.add_argument('--repeats', type=int, default=3,
+                        help='the number of timed runs per size')
+    parser.add_argument('--seed', type=int, default=0,
+                        help='the seed of the data generators')
+    parser.add_argument('--output', help='write JSON results to this file')
+    parser.add_argument('--compare', metavar='BASELINE',
+                        help='compare against a previous JSON results file')
+    parser.add_argument('--instrument', action='store_true',
+                        help='add per-phase timers and counters to results')
+    args = parser.parse_args()
+
+    if args.instrument:
+        instrument.metrics.enable()
+
+    # algorithm output is not part of the benchmark
+    fastio.redirect_stdout(open(os.devnull, 'wb'))
+
+    results = {'environment': environment(), 'results': []}
+
+    for benchmark in BENCHMARKS:
+        if args.only and benchmark.name not in args.only:
+            continue
+
+        for size in benchmark.quick_sizes if args.quick else benchmark.sizes:
+            result = measure(benchmark, size, args.seed, args.repeats)
+            results['results'].append(result)
+
+            print(f'{benchmark.name:<20} {size:>10} '
+                  f'{result["wall_time"]:>10.4f}s '
+                  f'{result["peak_memory"] / 2 ** 20:>9.1f}MiB '
+                  f'{result["throughput"] or 0:>12.0f} {benchmark.unit}/s',
+                  file=sys.stderr)
+
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(results, f, indent=2)
+
+    if args.compare:
+        with open(args.compare) as f:
+            compare(json.load(f), results)
+    elif not args.output:
+        json.dump(results, sys.stdout, indent=2)
+        print()
+
+
+if __name__ == '__main__':
+    main()
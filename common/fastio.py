@@ -0,0 +1,313 @@
+import atexit
+import mmap
+from collections import deque
+import os
+import re
+import stat
+import sys
+
+import numpy as np
+
+WHITESPACE = np.frombuffer(b' \t\n\r\v\f', dtype=np.uint8)
+BLANK_LINE = re.compile(rb'^[ \t\r]*$', re.MULTILINE)
+
+
+class FastReader:
+    """
+    Reads a whole binary stream at once and parses lines, integer tables and
+    ragged integer rows from it.
+
+    Regular files are memory-mapped, other streams are read to EOF in large
+    blocks. Line boundaries are located once with NumPy, so taking a block
+    of lines is O(1) regardless of its length.
+    """
+
+    def __init__(self, stream):
+        """
+        Initializes a FastReader instance.
+
+        :param stream: a binary file-like object (e.g. sys.stdin.buffer)
+        """
+        self.data = read_all(stream)
+        self.newlines = np.flatnonzero(
+            np.frombuffer(self.data, dtype=np.uint8) == ord('\n'))
+        self.line = 0
+
+    def __iter__(self):
+        return self
+
+    def __next__(self):
+        line = self.readline()
+        if not line:
+            raise StopIteration
+
+        return line
+
+    def readline(self):
+        """
+        Reads the next line like a text file would.
+
+        :return: the line including its newline, or '' at the end of input
+        """
+        if self._line_start(self.line) >= len(self.data):
+            return ''
+
+        block = self.read_block(1)
+        has_newline = self.line - 1 < len(self.newlines)
+
+        return block.decode() + ('\n' if has_newline else '')
+
+    def read_block(self, num_lines):
+        """
+        Reads the next num_lines lines as one bytes block.
+
+        :param num_lines: the number of lines to read
+        :return: the lines without the last newline
+        """
+        block = self._lines_bytes(self.line, self.line + num_lines)
+        self.line += num_lines
+
+        return block
+
+    def read_lines(self, num_lines):
+        """
+        Reads the next num_lines lines.
+
+        :param num_lines: the number of lines to read
+        :return: a list of str lines without newlines
+        """
+        if num_lines == 0:
+            return []
+
+        return self.read_block(num_lines).decode().split('\n')
+
+    def read_until_blank(self):
+        """
+        Reads lines up to the first blank line or the end of input.
+
+        The blank line is consumed but not returned.
+
+        :return: the lines as one bytes block
+        """
+        start = self._line_start(self.line)
+        blank_line = BLANK_LINE.search(self.data, start)
+
+        if blank_line is None:
+            end_line = len(self.newlines) + 1
+        else:
+            end_line = int(np.searchsorted(self.newlines, blank_line.start()))
+
+        block = self._lines_bytes(self.line, end_line)
+        self.line = end_line + 1
+
+        return block
+
+    def read_int_table(self, num_lines):
+        """
+        Reads the next num_lines lines of the same number of integers.
+
+        :param num_lines: the number of lines to read
+        :return: a (num_lines, num_columns) int array
+        """
+        values = parse_ints(self.read_block(num_lines))
+
+        if num_lines == 0:
+            return values.reshape(0, 0)
+
+        return values.reshape(num_lines, -1)
+
+    def read_ragged_rows(self, num_lines):
+        """
+        Reads the next num_lines lines of any number of integers.
+
+        :param num_lines: the number of lines to read
+        :return: an int array of all values and an indptr array such that
+                 values[indptr[i]:indptr[i + 1]] is the i-th row
+        """
+        block = self.read_block(num_lines)
+        chars = np.frombuffer(block, dtype=np.uint8)
+
+        is_space = np.isin(chars, WHITESPACE)
+        token_starts = ~is_space & np.r_[True, is_space[:-1]]
+        num_tokens = np.cumsum(token_starts)
+
+        indptr = np.zeros(num_lines + 1, dtype=np.int64)
+        row_ends = np.r_[np.flatnonzero(chars == ord('\n')), len(chars) - 1]
+        if len(chars):
+            indptr[1:] = num_tokens[row_ends[:num_lines]]
+
+        return parse_ints(block), indptr
+
+    def _line_start(self, line):
+        """Returns the offset of the given line in the data."""
+        if line == 0:
+            return 0
+        if line - 1 < len(self.newlines):
+            return int(self.newlines[line - 1]) + 1
+
+        return len(self.data)
+
+    def _lines_bytes(self, start_line, end_line):
+        """Returns lines [start_line, end_line) without the last newline."""
+        start = self._line_start(start_line)
+
+        if end_line <= start_line:
+            return self.data[start:start]
+
+        if end_line - 1 < len(self.newlines):
+            end = int(self.newlines[end_line - 1])
+        else:
+            end = len(self.data)
+
+        return self.data[start:max(end, start)]
+
+
+class StreamReader:
+    """
+    Reads lines from a binary stream block by block, for streaming
+    algorithms which must answer queries before the input ends.
+
+    Every refill reads at most one block of the data available so far, so
+    memory is bounded by the block size (plus the longest line), and the
+    given writer is flushed before each refill, so the answers to all lines
+    read so far are written before the reader waits for more input.
+    """
+
+    def __init__(self, stream, writer=None, block_size=1 << 20):
+        """
+        Initializes a StreamReader instance.
+
+        :param stream: a binary file-like object (e.g. sys.stdin.buffer)
+        :param writer: a FastWriter to flush before blocking on the stream
+        :param block_size: the maximum number of bytes read at once
+        """
+        self.stream = stream
+        self.writer = writer
+        self.block_size = block_size
+
+        self.lines = deque()
+        self.partial_line = b''
+        self.eof = False
+
+    def readline(self):
+        """
+        Reads the next line like a text file would.
+
+        :return: the line including its newline, or '' at the end of input
+        """
+        while not self.lines:
+            if self.eof:
+                line, self.partial_line = self.partial_line, b''
+                return line.decode()
+
+            self._read_block()
+
+        return self.lines.popleft()
+
+    def _read_block(self):
+        """Reads the next block of the stream into complete lines."""
+        if self.writer is not None:
+            self.writer.flush()
+
+        read = getattr(self.stream, 'read1', self.stream.read)
+        block = read(self.block_size)
+
+        if not block:
+            self.eof = True
+            return
+
+        lines = (self.partial_line + block).split(b'\n')
+        self.partial_line = lines.pop()
+        self.lines.extend(line.decode() + '\n' for line in lines)
+
+
+class FastWriter:
+    """Collects output lines and writes them as one buffered byte stream."""
+
+    def __init__(self, stream):
+        """
+        Initializes a FastWriter instance.
+
+        :param stream: a binary file-like object (e.g. sys.stdout.buffer)
+        """
+        self.stream = stream
+        self.lines = []
+
+    def print(self, *values, sep=' '):
+        """Adds a line formatted the same way as the print function does."""
+        self.lines.append(sep.join(map(str, values)))
+
+    def write_lines(self, values):
+        """Adds one line for each of the given values."""
+        self.lines.extend(map(str, values))
+
+    def flush(self):
+        """Writes the collected lines to the stream."""
+        if self.lines:
+            self.stream.write(('\n'.join(self.lines) + '\n').encode())
+            self.lines = []
+
+        self.stream.flush()
+
+
+def read_all(stream):
+    """
+    Reads the whole stream, memory-mapping it if it is a regular file.
+
+    :param stream: a binary file-like object
+    :return: a bytes-like object with the stream contents
+    """
+    try:
+        fileno = stream.fileno()
+        file_stat = os.fstat(fileno)
+    except (AttributeError, OSError, ValueError):
+        return stream.read()
+
+    if (stat.S_ISREG(file_stat.st_mode) and file_stat.st_size > 0
+            and os.lseek(fileno, 0, os.SEEK_CUR) == 0):
+        return mmap.mmap(fileno, 0, access=mmap.ACCESS_READ)
+
+    return stream.read()
+
+
+def parse_ints(block):
+    """Parses whitespace-separated integers from a bytes block."""
+    return np.array(block.split(), dtype=np.int64)
+
+
+_stdin = None
+_stdout = None
+
+
+def stdin():
+    """Returns the shared FastReader of sys.stdin."""
+    global _stdin
+
+    if _stdin is None:
+        _stdin = FastReader(sys.stdin.buffer)
+
+    return _stdin
+
+
+def stream_stdin():
+    """
+    Returns a StreamReader of sys.stdin which flushes the shared FastWriter
+    of sys.stdout before waiting for input.
+    """
+    return StreamReader(sys.stdin.buffer, stdout())
+
+
+def stdout():
+    """Returns the shared FastWriter of sys.stdout, flushed at exit."""
+    global _stdout
+
+    if _stdout is None:
+        _stdout = FastWriter(sys.stdout.buffer)
+        atexit.register(_stdout.flush)
+
+    return _stdout
+
+
+def redirect_stdout(stream):
+    """Makes the shared FastWriter write to the given binary stream."""
+    stdout().stream = stream
@@ -0,0 +1,176 @@
+import atexit
+import json
+import os
+import sys
+import time
+from collections import defaultdict
+from contextlib import nullcontext
+
+ENVIRONMENT_VARIABLE = 'AVSP_INSTRUMENT'
+
+NULL_TIMER = nullcontext()
+
+
+class Instrumentation:
+    """
+    Collects phase timers, counters and histograms.
+
+    Instrumentation is disabled by default. While disabled, timer returns a
+    shared no-op context manager and count/observe return immediately; hot
+    loops should additionally check the enabled attribute before recording.
+    """
+
+    def __init__(self):
+        """Initializes a disabled Instrumentation instance."""
+        self.enabled = False
+        self.callback = None
+        self.path = None
+        self.reset()
+
+    def reset(self):
+        """Discards all recorded values."""
+        self.timers = defaultdict(lambda: [0.0, 0])
+        self.counters = defaultdict(int)
+        self.histograms = {}
+
+    def enable(self, callback=None, path=None):
+        """
+        Enables instrumentation.
+
+        :param callback: a function called with the report on export
+        :param path: a file to write the JSON report to on export,
+                     '-' for sys.stderr
+        """
+        self.enabled = True
+        self.callback = callback
+        self.path = path
+
+    def disable(self):
+        """Disables instrumentation."""
+        self.enabled = False
+
+    def timer(self, name):
+        """Returns a context manager that adds its duration to a timer."""
+        if not self.enabled:
+            return NULL_TIMER
+
+        return Timer(self, name)
+
+    def add_time(self, name, seconds):
+        """Adds the given duration to a timer."""
+        timer = self.timers[name]
+        timer[0] += seconds
+        timer[1] += 1
+
+    def count(self, name, value=1):
+        """Adds the given value to a counter."""
+        if self.enabled:
+            self.counters[name] += value
+
+    def observe(self, name, value):
+        """Records the given value in a histogram."""
+        if not self.enabled:
+            return
+
+        if name not in self.histograms:
+            self.histograms[name] = Histogram()
+
+        self.histograms[name].add(value)
+
+    def report(self):
+        """Returns a dict of all recorded values."""
+        return {
+            'timers': {name: {'total': total, 'count': count}
+                       for name, (total, count) in self.timers.items()},
+            'counters': dict(self.counters),
+            'histograms': {name: histogram.report()
+                           for name, histogram in self.histograms.items()},
+        }
+
+    def export(self):
+        """Passes the report to the callback and writes it to the path."""
+        if not self.enabled:
+            return
+
+        report = self.report()
+
+        if self.callback is not None:
+            self.callback(report)
+
+        if self.path == '-':
+            json.dump(report, sys.stderr, indent=2)
+            sys.stderr.write('\n')
+        elif self.path is not None:
+            with open(self.path, 'w') as f:
+                json.dump(report, f, indent=2)
+
+
+class Timer:
+    """A context manager which adds its duration to a timer."""
+    __slots__ = ('instrumentation', 'name', 'start')
+
+    def __init__(self, instrumentation, name):
+        self.instrumentation = instrumentation
+        self.name = name
+        self.start = None
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc_info):
+        self.instrumentation.add_time(self.name,
+                                      time.perf_counter() - self.start)
+
+
+class Histogram:
+    """A histogram of non-negative values in power-of-2 buckets."""
+
+    def __init__(self):
+        self.count = 0
+        self.total = 0
+        self.min = None
+        self.max = None
+        self.buckets = defaultdict(int)
+
+    def add(self, value):
+        """Adds a value to the histogram."""
+        self.count += 1
+        self.total += value
+        self.min = value if self.min is None else min(self.min, value)
+        self.max = value if self.max is None else max(self.max, value)
+
+        # bucket b holds values in [2 ** (b - 1), 2 ** b)
+        self.buckets[int(value).bit_length() if value >= 1 else 0] += 1
+
+    def report(self):
+        """Returns a dict describing the histogram."""
+        return {
+            'count': self.count,
+            'sum': self.total,
+            'min': self.min,
+            'max': self.max,
+            'buckets': {f'<{2 ** b}': n
+                        for b, n in sorted(self.buckets.items())},
+        }
+
+
+def from_environment():
+    """
+    Creates the Instrumentation configured by the AVSP_INSTRUMENT variable.
+
+    Unset, empty or '0' disables instrumentation. '1' or '-' writes the JSON
+    report to sys.stderr at exit, and any other value is the path of the
+    JSON report file.
+    """
+    instrumentation = Instrumentation()
+    setting = os.environ.get(ENVIRONMENT_VARIABLE, '')
+
+    if setting not in ('', '0'):
+        instrumentation.enable(path='-' if setting == '1' else setting)
+        atexit.register(instrumentation.export)
+
+    return instrumentation
+
+
+metrics = from_environment()
@@ -0,0 +1,178 @@
+import argparse
+import asyncio
+import os
+import signal
+import stat
+import sys
+
+from instrument import metrics
+
+# long lines of DGIM stream bits are single queries
+LINE_LIMIT = 2 ** 24
+
+
+class QueryServer:
+    """
+    Answers line-based queries over a local Unix socket.
+
+    Every connection sends queries as lines and receives one response line
+    for every query whose handler returns a value (handlers returning None,
+    e.g. for DGIM stream bits, send nothing). Responses of a connection keep
+    the order of its queries.
+
+    Connections are served concurrently by an asyncio event loop. Handlers
+    run on the loop itself, one query at a time, so they may update the
+    shared state (e.g. the NodeRank result cache) without locking; the loop
+    switches connections after every query.
+    """
+
+    def __init__(self, handler, path):
+        """
+        Initializes a QueryServer instance.
+
+        :param handler: a function (stripped query line) -> response or None
+        :param path: the path of the Unix socket to listen on
+        """
+        self.handler = handler
+        self.path = path
+
+    def answer(self, line):
+        """
+        Answers a single query.
+
+        :param line: the stripped query line
+        :return: the response line, or None if there is no response
+        """
+        metrics.count('queryserver.queries')
+
+        try:
+            with metrics.timer('queryserver.query'):
+                return self.handler(line)
+        except Exception as e:
+            # a malformed query must not stop the server
+            metrics.count('queryserver.errors')
+            return f'error: {type(e).__name__}: {e}'
+
+    async def handle_connection(self, reader, writer):
+        """Answers the queries of one connection until it is closed."""
+        try:
+            async for line in reader:
+                query = line.decode().strip()
+                if not query:
+                    continue
+
+                response = self.answer(query)
+                if response is not None:
+                    writer.write(f'{response}\n'.encode())
+                    await writer.drain()
+
+                # let the other connections take their turn
+                await asyncio.sleep(0)
+        except ConnectionError:
+            pass
+        finally:
+            writer.close()
+
+    async def serve(self):
+        """Listens on the socket until SIGINT or SIGTERM is received."""
+        remove_stale_socket(self.path)
+        server = await asyncio.start_unix_server(
+            self.handle_connection, self.path, limit=LINE_LIMIT)
+
+        loop = asyncio.get_running_loop()
+        stopped = loop.create_future()
+        for sig in (signal.SIGINT, signal.SIGTERM):
+            loop.add_signal_handler(sig, stopped.cancel)
+
+        print(f'Serving on {self.path}', file=sys.stderr)
+
+        try:
+            async with server:
+                await server.start_serving()
+                await stopped
+        except asyncio.CancelledError:
+            pass
+        finally:
+            os.unlink(self.path)
+
+
+def remove_stale_socket(path):
+    """Removes a socket left behind at path by a stopped server."""
+    try:
+        if stat.S_ISSOCK(os.stat(path).st_mode):
+            os.unlink(path)
+    except FileNotFoundError:
+        pass
+
+
+def serve(handler, path):
+    """
+    Answers queries with the given handler over a Unix socket.
+
+    :param handler: a function (stripped query line) -> response or None
+    :param path: the path of the Unix socket to listen on
+    """
+    asyncio.run(QueryServer(handler, path).serve())
+
+
+def socket_path(description=None):
+    """
+    Parses the --serve SOCKET command-line option of a lab script.
+
+    :param description: the description of the lab script
+    :return: the socket path, or None if the script should run once
+    """
+    parser = argparse.ArgumentParser(description=description)
+    add_serve_argument(parser)
+
+    return parser.parse_args().serve
+
+
+def add_serve_argument(parser):
+    """Adds the --serve SOCKET option to an argparse parser."""
+    parser.add_argument('--serve', metavar='SOCKET',
+                        help='build the state from stdin, then answer '
+                             'queries on this Unix socket')
+
+
+async def query(path, lines):
+    """
+    Sends queries to a QueryServer and collects its responses.
+
+    :param path: the path of the server socket
+    :param lines: an iterable of query lines without newlines
+    :return: a list of response lines without newlines
+    """
+    reader, writer = await asyncio.open_unix_connection(path)
+
+    async def send():
+        writer.write(''.join(f'{line}\n' for line in lines).encode())
+        await writer.drain()
+        writer.write_eof()
+
+    # read while sending, so neither side blocks on a full socket buffer
+    _, data = await asyncio.gather(send(), reader.read())
+
+    responses = data.decode().splitlines()
+    writer.close()
+    await writer.wait_closed()
+
+    return responses
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description='Sends the queries from stdin to a lab query server and '
+                    'prints the responses.')
+    parser.add_argument('socket', help='the path of the server socket')
+    args = parser.parse_args()
+
+    lines = sys.stdin.read().splitlines()
+    responses = asyncio.run(query(args.socket, lines))
+
+    if responses:
+        sys.stdout.write('\n'.join(responses) + '\n')
+
+
+if __name__ == '__main__':
+    main()
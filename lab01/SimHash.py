@@ -1,8 +1,15 @@
 import hashlib
+import os
 import sys
 
 import numpy as np
 
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)),
+                             os.pardir, 'common'))
+from fastio import stdin, stdout  # noqa: E402
+from instrument import metrics  # noqa: E402
+import queryserver  # noqa: E402
+
 
 def simhash(text, output_size=128):
     """
@@ -36,7 +43,41 @@ def hex_string(bit_array):
     return hex(int(bit_string, 2))[2:]
 
 
-def sequential_search():
+def parse_text_hashes():
+    """
+    Parses texts from sys.stdin input and hashes them with SimHash.
+
+    The first input line contains the number of texts to read - N, and the
+    next N lines are the N texts with space-separated tokens.
+
+    :return: a (N, output_size) array of the text hashes
+    """
+    reader = stdin()
+
+    num_texts = int(reader.readline())
+    with metrics.timer('simhash.hash'):
+        text_hashes = [simhash(text) for text in reader.read_lines(num_texts)]
+
+    # an explicit width keeps the shape valid when there are no texts
+    return np.array(text_hashes, dtype=int).reshape(num_texts, 128)
+
+
+def count_similar(text_hashes, i, k):
+    """
+    Counts the texts whose hashes differ from the hash of the i-th text
+    by at most k bits, excluding the i-th text.
+
+    :param text_hashes: the array of text hashes
+    :param i: the index of the queried text
+    :param k: the maximum Hamming distance
+    :return: the number of similar texts
+    """
+    distances = np.count_nonzero(text_hashes != text_hashes[i], axis=1)
+
+    return int(np.count_nonzero(distances <= k)) - 1
+
+
+def sequential_search(text_hashes):
     """
     Performs a sequential search of similar texts based on
     user-specified queries.
@@ -45,30 +86,34 @@ def sequential_search():
     their SimHash signatures.
 
     This function expects user input of the following format:
-    * the first input contains the number of texts to read - N
-    * the next N inputs are the N texts with space-separated tokens
-    * the (N+1)-th input contains the number of queries to perform - Q
+    * the first input contains the number of queries to perform - Q
     * the next Q inputs are the Q queries of the form - I K
       * output the number of texts whose hashes differ from
         the hash of the I-th text by at most K bits
+
+    :param text_hashes: the text hashes returned by parse_text_hashes
     """
-    num_texts = int(next(sys.stdin).rstrip())
-    text_hashes = [simhash(next(sys.stdin).rstrip()) for _ in range(num_texts)]
+    reader, writer = stdin(), stdout()
 
-    num_queries = int(next(sys.stdin).rstrip())
+    num_queries = int(reader.readline())
+    metrics.count('simhash.queries', num_queries)
 
-    for _ in range(num_queries):
-        i, k = map(int, next(sys.stdin).rstrip().split())
-        ith_hash = text_hashes[i]
+    for i, k in reader.read_int_table(num_queries).tolist():
+        writer.print(count_similar(text_hashes, i, k))
 
-        num_diff_texts = -1  # excluding the i-th hash
 
-        for text_hash in text_hashes:
-            if (ith_hash != text_hash).sum() <= k:
-                num_diff_texts += 1
+def handle_query(text_hashes, query):
+    """Answers a single "I K" query of a query server."""
+    i, k = map(int, query.split())
 
-        print(num_diff_texts)
+    return str(count_similar(text_hashes, i, k))
 
 
 if __name__ == '__main__':
-    sequential_search()
+    path = queryserver.socket_path('Counts texts similar to queried texts.')
+    hashes = parse_text_hashes()
+
+    if path is None:
+        sequential_search(hashes)
+    else:
+        queryserver.serve(lambda query: handle_query(hashes, query), path)
@@ -1,9 +1,15 @@
+import os
 import sys
 
 import numpy as np
 
 from SimHash import simhash
 
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)),
+                             os.pardir, 'common'))
+from fastio import stdin, stdout  # noqa: E402
+from instrument import metrics  # noqa: E402
+
 
 def lsh(text_hashes, num_bands=8):
     """
@@ -55,16 +61,20 @@ def lsh_search():
       * output the number of texts whose hashes differ from
         the hash of the I-th text by at most K bits
     """
-    num_texts = int(next(sys.stdin).rstrip())
-    text_hashes = [simhash(next(sys.stdin).rstrip()) for _ in range(num_texts)]
+    reader, writer = stdin(), stdout()
+
+    num_texts = int(reader.readline())
+    with metrics.timer('lsh.hash'):
+        text_hashes = [simhash(text) for text in reader.read_lines(num_texts)]
 
-    candidates = lsh(text_hashes)
+    with metrics.timer('lsh.candidates'):
+        candidates = lsh(text_hashes)
 
-    num_queries = int(next(sys.stdin).rstrip())
+    num_queries = int(reader.readline())
 
-    for _ in range(num_queries):
-        i, k = map(int, next(sys.stdin).rstrip().split())
+    for i, k in reader.read_int_table(num_queries).tolist():
         ith_candidates = candidates.get(i, set())
+        metrics.observe('lsh.candidates_per_query', len(ith_candidates))
 
         num_diff_texts = 0
 
@@ -72,7 +82,7 @@ def lsh_search():
             if (text_hashes[i] != text_hashes[text_idx]).sum() <= k:
                 num_diff_texts += 1
 
-        print(num_diff_texts)
+        writer.print(num_diff_texts)
 
 
 if __name__ == '__main__':
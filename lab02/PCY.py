@@ -1,23 +1,28 @@
+import os
 import sys
 from itertools import combinations
 from collections import defaultdict
 
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)),
+                             os.pardir, 'common'))
+from fastio import stdin, stdout  # noqa: E402
+from instrument import metrics  # noqa: E402
+
 
 def print_output(item_counts, freq_pairs, threshold):
     """Prints the PCY algorithm output."""
+    writer = stdout()
+
     # number of frequent pairs - A-priori
     num_freq_items = sum(c >= threshold for c in item_counts.values())
-    print(num_freq_items * (num_freq_items - 1) // 2)
+    writer.print(num_freq_items * (num_freq_items - 1) // 2)
 
     # number of frequent pairs - PCY
-    print(len(freq_pairs))
+    writer.print(len(freq_pairs))
 
     # frequent pair counts (descending)
     sorted_pair_counts = sorted(freq_pairs.values(), reverse=True)
-
-    for count in sorted_pair_counts:
-        if count >= threshold:
-            print(count)
+    writer.write_lines(c for c in sorted_pair_counts if c >= threshold)
 
 
 def pcy(num_baskets, num_buckets, threshold, basket_input):
@@ -35,43 +40,58 @@ def pcy(num_baskets, num_buckets, threshold, basket_input):
     # first pass - count individual items
     item_counts = defaultdict(int)
 
-    for basket_string in basket_input:
-        basket = list(map(int, basket_string.rstrip().split()))
-        baskets.append(basket)
+    with metrics.timer('pcy.pass1'):
+        for basket_string in basket_input:
+            basket = list(map(int, basket_string.rstrip().split()))
+            baskets.append(basket)
 
-        for item in basket:
-            item_counts[item] += 1
+            for item in basket:
+                item_counts[item] += 1
 
     # second pass - hash each item pair into a bucket and increase its count
     buckets = defaultdict(int)
 
-    for basket in baskets:
-        pairs = combinations(basket, 2)
+    with metrics.timer('pcy.pass2'):
+        for basket in baskets:
+            pairs = combinations(basket, 2)
 
-        for i, j in pairs:
-            if item_counts[i] >= threshold and item_counts[j] >= threshold:
-                k = ((i * len(item_counts)) + j) % num_buckets
-                buckets[k] += 1
+            for i, j in pairs:
+                if item_counts[i] >= threshold and item_counts[j] >= threshold:
+                    k = ((i * len(item_counts)) + j) % num_buckets
+                    buckets[k] += 1
 
     # third pass - count frequent item pairs
     freq_pairs = defaultdict(int)
 
-    for basket in baskets:
-        pairs = combinations(basket, 2)
+    with metrics.timer('pcy.pass3'):
+        for basket in baskets:
+            pairs = combinations(basket, 2)
 
-        for i, j in pairs:
-            if item_counts[i] >= threshold and item_counts[j] >= threshold:
-                k = ((i * len(item_counts)) + j) % num_buckets
+            for i, j in pairs:
+                if item_counts[i] >= threshold and item_counts[j] >= threshold:
+                    k = ((i * len(item_counts)) + j) % num_buckets
 
-                if buckets[k] >= threshold:
-                    freq_pairs[i, j] += 1
+                    if buckets[k] >= threshold:
+                        freq_pairs[i, j] += 1
+
+    if metrics.enabled:
+        metrics.count('pcy.baskets', len(baskets))
+        metrics.count('pcy.items', len(item_counts))
+        metrics.count('pcy.frequent_items',
+                      sum(c >= threshold for c in item_counts.values()))
+        metrics.count('pcy.used_buckets', len(buckets))
+        metrics.count('pcy.frequent_buckets',
+                      sum(c >= threshold for c in buckets.values()))
+        metrics.count('pcy.candidate_pairs', len(freq_pairs))
 
     print_output(item_counts, freq_pairs, threshold)
 
 
 if __name__ == '__main__':
-    num_baskets = int(sys.stdin.readline().rstrip())
-    threshold = float(sys.stdin.readline().rstrip()) * num_baskets
-    num_buckets = int(sys.stdin.readline().rstrip())
+    reader = stdin()
+
+    num_baskets = int(reader.readline())
+    threshold = float(reader.readline()) * num_baskets
+    num_buckets = int(reader.readline())
 
-    pcy(num_baskets, num_buckets, threshold, sys.stdin)
+    pcy(num_baskets, num_buckets, threshold, reader.read_lines(num_baskets))
@@ -1,7 +1,18 @@
+import argparse
+import math
+import os
 import sys
 from decimal import Decimal, ROUND_HALF_UP
+from functools import partial
 
 import numpy as np
+from scipy.sparse import coo_matrix
+
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)),
+                             os.pardir, 'common'))
+from fastio import stdin, stdout  # noqa: E402
+from instrument import metrics  # noqa: E402
+import queryserver  # noqa: E402
 
 
 def pearson_sim_matrix(x):
@@ -14,6 +25,176 @@ def subtract_nonzero_mean(x):
     return np.where(x > 0, x - x[x > 0].mean(), x)
 
 
+def pearson_vectors(x):
+    """
+    Returns the rows of x transformed such that the dot product of two rows
+    is their Pearson similarity (as in pearson_sim_matrix).
+
+    :return: the rows centred like subtract_nonzero_mean, centred again
+             and scaled to unit length (rows with no variance are zeros)
+    """
+    num_ratings = np.count_nonzero(x, axis=1)
+    means = x.sum(axis=1) / np.maximum(num_ratings, 1)
+    z = np.where(x > 0, x - means[:, np.newaxis], 0.)
+    z -= z.mean(axis=1, keepdims=True)
+
+    norms = np.linalg.norm(z, axis=1, keepdims=True)
+    np.divide(z, norms, out=z, where=norms > 0)
+
+    return z
+
+
+def lsh_buckets(vectors, num_bands, rows_per_band, rng):
+    """
+    Hashes rows into buckets with random-hyperplane LSH.
+
+    Every row gets a signature of num_bands * rows_per_band bits, the signs
+    of its projections onto random hyperplanes. Two rows agree on a bit with
+    probability 1 - angle / pi, so rows with Pearson similarity p share a
+    bucket in at least one band with probability
+    1 - (1 - (1 - arccos(p) / pi) ** rows_per_band) ** num_bands.
+    All-zero rows have no similar rows and are skipped.
+
+    :param vectors: the rows to hash
+    :param num_bands: the number of signature bands
+    :param rows_per_band: the number of bits per band (at most 62)
+    :param rng: a numpy.random.Generator for the hyperplanes
+    :return: a generator of (band, bucket, keys) tuples, where bucket is a
+             sorted row index array of a bucket with at least two rows and
+             keys is a (num_rows, num_bands) array of the bucket keys of
+             all rows (-1 for skipped rows)
+    """
+    rows = np.flatnonzero(vectors.any(axis=1))
+    planes = rng.standard_normal((vectors.shape[1],
+                                  num_bands * rows_per_band))
+    signatures = vectors[rows] @ planes >= 0
+    powers = np.int64(1) << np.arange(rows_per_band, dtype=np.int64)
+
+    keys = np.full((len(vectors), num_bands), -1, dtype=np.int64)
+    keys[rows] = (signatures.reshape(len(rows), num_bands, rows_per_band)
+                  @ powers)
+
+    for band in range(num_bands):
+        order = np.argsort(keys[rows, band], kind='stable')
+        bounds = np.flatnonzero(np.diff(keys[rows[order], band])) + 1
+
+        for bucket in np.split(rows[order], bounds):
+            if len(bucket) > 1:
+                yield band, bucket, keys
+
+
+def lsh_parameters(threshold, probability=0.95, max_bits=256):
+    """
+    Chooses the LSH bands such that rows with a Pearson similarity of at
+    least threshold share a bucket with at least the given probability.
+
+    Of all band sizes whose signature fits into max_bits, the one which
+    makes the fewest unrelated rows (with similarity 0) share a bucket is
+    chosen. Low thresholds are close to the similarity of unrelated rows,
+    so they need few bits per band and compare most pairs: e.g. 0.1 gives
+    36 bands of 4 bits which compare about 90% of all pairs, while 0.7
+    gives 30 bands of 8 bits which compare about 11%.
+
+    :param threshold: the Pearson similarity to find (between 0 and 1)
+    :param probability: the probability of finding a pair with threshold
+                        similarity
+    :param max_bits: the maximum signature length
+    :return: num_bands, rows_per_band
+    """
+    if not 0 < threshold < 1 or not 0 < probability < 1:
+        raise ValueError('threshold and probability must be in (0, 1)')
+
+    # the probability that a signature bit of two rows agrees
+    bit_probability = 1 - math.acos(threshold) / math.pi
+    best = None
+
+    for rows_per_band in range(1, 63):
+        num_bands = math.ceil(math.log(1 - probability)
+                              / math.log1p(-bit_probability ** rows_per_band))
+        if num_bands * rows_per_band > max_bits:
+            break
+
+        unrelated = 1 - (1 - 0.5 ** rows_per_band) ** num_bands
+        if best is None or unrelated < best[0]:
+            best = unrelated, num_bands, rows_per_band
+
+    if best is None:
+        raise ValueError(f'No LSH bands fit into {max_bits} bits')
+
+    return best[1:]
+
+
+def lsh_pearson_sim_matrix(x, threshold=None, num_bands=None,
+                           rows_per_band=None, seed=0, chunk_size=1024):
+    """
+    Calculates an approximate Pearson similarity matrix for x.
+
+    Only pairs of rows sharing an LSH bucket (see lsh_buckets) get their
+    exact Pearson similarity, computed for a whole bucket at once, and
+    only positive similarities (the ones used for predictions) are stored.
+    A pair is stored for the first band it shares a bucket in, so memory
+    is bounded by the number of distinct similar candidate pairs.
+
+    :param x: the matrix whose rows are compared
+    :param threshold: the Pearson similarity which should be found with
+                      95% probability (see lsh_parameters), unless
+                      num_bands and rows_per_band are given
+    :param num_bands: the number of LSH bands
+    :param rows_per_band: the number of signature bits per band
+    :param seed: the random seed of the hyperplanes
+    :param chunk_size: the number of bucket rows compared at once
+    :return: the similarity matrix in scipy.sparse.csr_matrix form
+    :raises ValueError: if neither threshold nor the bands are given
+    """
+    if num_bands is None or rows_per_band is None:
+        if threshold is None:
+            raise ValueError('Either threshold or num_bands and '
+                             'rows_per_band must be given')
+
+        num_bands, rows_per_band = lsh_parameters(threshold)
+
+    num_rows = x.shape[0]
+    vectors = pearson_vectors(x)
+    rng = np.random.default_rng(seed)
+    index_dtype = np.int32 if num_rows < 2 ** 31 else np.int64
+    pair_rows, pair_cols, pair_sims = [], [], []
+
+    with metrics.timer('cf.lsh_similarities'):
+        for band, bucket, keys in lsh_buckets(vectors, num_bands,
+                                              rows_per_band, rng):
+            metrics.count('cf.compared_pairs',
+                          len(bucket) * (len(bucket) - 1) // 2)
+            bucket_vectors = vectors[bucket]
+
+            for start in range(0, len(bucket), chunk_size):
+                block = (bucket_vectors[start:start + chunk_size]
+                         @ bucket_vectors.T)
+
+                # keep each pair i < j once (buckets are sorted) and only
+                # if it did not share a bucket in an earlier band
+                i, j = np.nonzero(block > 0)
+                upper = start + i < j
+                i, j = i[upper], j[upper]
+                rows, cols = bucket[start + i], bucket[j]
+                new = (keys[rows, :band] != keys[cols, :band]).all(axis=1)
+
+                pair_rows.append(rows[new].astype(index_dtype))
+                pair_cols.append(cols[new].astype(index_dtype))
+                pair_sims.append(block[i[new], j[new]])
+
+    # every row with variance is most similar to itself, as in corrcoef
+    diagonal = np.flatnonzero(vectors.any(axis=1)).astype(index_dtype)
+
+    # each pair is stored in both directions
+    sims = np.concatenate(pair_sims + pair_sims + [np.ones(len(diagonal))])
+    del pair_sims
+    i = np.concatenate(pair_rows + pair_cols + [diagonal])
+    j = np.concatenate(pair_cols + pair_rows + [diagonal])
+    del pair_rows, pair_cols
+
+    return coo_matrix((sims, (i, j)), shape=(num_rows, num_rows)).tocsr()
+
+
 def compute_rating(sims, ratings):
     """Returns the rating computed with the given similarities and ratings."""
     return (sims * ratings).sum() / sims.sum()
@@ -29,36 +210,122 @@ def k_most_similar(idx, o_idx, k, sims, ratings):
     return k_most_similar_idxs
 
 
+def k_most_similar_sparse(idx, o_idx, k, sims, ratings):
+    """
+    Returns the k most similar indices (items or users) and their
+    similarities from a sparse similarity matrix.
+    """
+    row = slice(sims.indptr[idx], sims.indptr[idx + 1])
+    order = np.argsort(-sims.data[row], kind='stable')
+    similar_idxs = sims.indices[row][order]
+    similarities = sims.data[row][order]
+
+    has_rating = ratings[similar_idxs, o_idx] != 0
+
+    return similar_idxs[has_rating][:k], similarities[has_rating][:k]
+
+
+def top_k_neighbours(sims, k):
+    """Returns the set of k most similar other indices of a similarity row."""
+    similar_idxs = np.argsort(-sims, kind='stable')
+
+    return set(similar_idxs[sims[similar_idxs] > 0][:k].tolist())
+
+
+def neighbour_recall(x, sims, k, idxs):
+    """
+    Calculates the recall of approximate k most similar neighbours.
+
+    The exact neighbours are the k rows with the highest positive Pearson
+    similarity (excluding the row itself); the recall is the fraction of
+    them which are also among the approximate k most similar rows.
+
+    :param x: the matrix whose rows are compared
+    :param sims: the approximate similarity matrix (scipy.sparse.csr_matrix)
+    :param k: the number of neighbours
+    :param idxs: the indices of the rows to evaluate
+    :return: the recall, or nan if no row has positive similarities
+    """
+    vectors = pearson_vectors(x)
+    num_found = num_exact = 0
+
+    for idx in idxs:
+        exact_sims = vectors @ vectors[idx]
+        exact_sims[idx] = 0.
+
+        approx_sims = sims[idx].toarray().ravel()
+        approx_sims[idx] = 0.
+
+        exact = top_k_neighbours(exact_sims, k)
+        num_found += len(exact & top_k_neighbours(approx_sims, k))
+        num_exact += len(exact)
+
+    return num_found / num_exact if num_exact else float('nan')
+
+
 def predict_rating(idx, o_idx, k, sims, ratings):
     """Predicts the rating of a given item/user."""
     k_most_similar_idxs = k_most_similar(idx, o_idx, k, sims, ratings)
+    metrics.observe('cf.neighbours', len(k_most_similar_idxs))
     k_most_similar_ratings = ratings[k_most_similar_idxs, o_idx]
     k_highest_sims = sims[idx, k_most_similar_idxs]
 
     return compute_rating(k_highest_sims, k_most_similar_ratings)
 
 
+def predict_rating_sparse(idx, o_idx, k, sims, ratings):
+    """Predicts the rating of a given item/user from sparse similarities."""
+    k_most_similar_idxs, k_highest_sims = k_most_similar_sparse(
+        idx, o_idx, k, sims, ratings)
+    metrics.observe('cf.neighbours', len(k_most_similar_idxs))
+    k_most_similar_ratings = ratings[k_most_similar_idxs, o_idx]
+
+    return compute_rating(k_highest_sims, k_most_similar_ratings)
+
+
 class CollaborativeFiltering:
     """Class for item-item and user-user collaborative filtering."""
     ITEM_ITEM_CF = 0
     USER_USER_CF = 1
 
-    def __init__(self, ratings, num_items, num_users):
+    def __init__(self, ratings, num_items, num_users, approximate=False,
+                 threshold=None, num_bands=None, rows_per_band=None, seed=0):
         """
         Inits the CollaborativeFiltering class.
 
         :param ratings: the num_items x num_users ratings matrix
         :param num_items: the total number of items
         :param num_users: the total number of users
+        :param approximate: compute similarities only for the candidate
+                            pairs of cosine LSH (see lsh_pearson_sim_matrix)
+        :param threshold: the Pearson similarity which LSH should find with
+                          95% probability (if approximate, either threshold
+                          or num_bands and rows_per_band must be given)
+        :param num_bands: the number of LSH bands, instead of threshold
+        :param rows_per_band: the number of bits per LSH band, instead of
+                              threshold
+        :param seed: the random seed of LSH (if approximate)
         """
         self.ratings = ratings
         self.ratings_T = ratings.T
 
         self.num_items = num_items
         self.num_users = num_users
+        self.approximate = approximate
 
-        self._item_sims = pearson_sim_matrix(ratings)
-        self._user_sims = pearson_sim_matrix(self.ratings_T)
+        if approximate:
+            sim_matrix = partial(lsh_pearson_sim_matrix, threshold=threshold,
+                                 num_bands=num_bands,
+                                 rows_per_band=rows_per_band, seed=seed)
+            self._predict_rating = predict_rating_sparse
+        else:
+            sim_matrix = pearson_sim_matrix
+            self._predict_rating = predict_rating
+
+        with metrics.timer('cf.item_similarities'):
+            self._item_sims = sim_matrix(ratings)
+        with metrics.timer('cf.user_similarities'):
+            self._user_sims = sim_matrix(self.ratings_T)
 
     def predict_rating(self, item, user, k, mode):
         """
@@ -72,12 +339,37 @@ class CollaborativeFiltering:
         :return: the predicted rating
         """
         if mode == self.ITEM_ITEM_CF:
-            return predict_rating(item, user, k, self._item_sims, self.ratings)
+            return self._predict_rating(item, user, k, self._item_sims,
+                                        self.ratings)
         elif mode == self.USER_USER_CF:
-            return predict_rating(user, item, k, self._user_sims, self.ratings_T)
+            return self._predict_rating(user, item, k, self._user_sims,
+                                        self.ratings_T)
         else:
             raise AttributeError(f'Unknown CF mode {mode}')
 
+    def recall(self, k, sample_size=1000, seed=0):
+        """
+        Calculates the recall of the approximate k most similar items and
+        users against the exact Pearson similarities.
+
+        :param k: the number of most similar items/users
+        :param sample_size: the number of items and of users to evaluate
+        :param seed: the random seed of the sample
+        :return: the item-item recall and the user-user recall
+        """
+        if not self.approximate:
+            raise ValueError('Recall is only defined for approximate CF')
+
+        rng = np.random.default_rng(seed)
+        recalls = []
+
+        for x, sims in ((self.ratings, self._item_sims),
+                        (self.ratings_T, self._user_sims)):
+            idxs = rng.choice(len(x), min(sample_size, len(x)), replace=False)
+            recalls.append(neighbour_recall(x, sims, k, idxs))
+
+        return tuple(recalls)
+
 
 def parse_ratings():
     """
@@ -89,16 +381,13 @@ def parse_ratings():
       (or X if no rating is given for an item)
     :return: the ratings matrix, num_items, num_users
     """
-    num_items, num_users = map(int, sys.stdin.readline().rstrip().split())
-
-    ratings = np.zeros((num_items, num_users), dtype=int)
-
-    for item in range(num_items):
-        item_ratings = sys.stdin.readline().rstrip().split()
+    reader = stdin()
+    num_items, num_users = map(int, reader.readline().split())
 
-        for user, rating in enumerate(item_ratings):
-            if rating != 'X':
-                ratings[item][user] = int(rating)
+    # missing ratings are zeros in the ratings matrix
+    ratings_block = reader.read_block(num_items).replace(b'X', b'0')
+    ratings = np.array(ratings_block.split(), dtype=int).reshape(
+        num_items, num_users)
 
     return ratings, num_items, num_users
 
@@ -113,15 +402,70 @@ def handle_queries(cf):
     * T -- the CF mode to use (0 = item-item, 1 = user-user)
     * K -- the number of most similar items/users to consider
     """
-    num_queries = int(sys.stdin.readline().rstrip())
+    reader, writer = stdin(), stdout()
+    num_queries = int(reader.readline())
+
+    for item, user, mode, k in reader.read_int_table(num_queries).tolist():
+        writer.print(answer_query(cf, item, user, mode, k))
+
+
+def answer_query(cf, item, user, mode, k):
+    """Returns the rounded predicted rating for an "I J T K" query."""
+    rating = cf.predict_rating(item - 1, user - 1, k, mode)
+
+    return Decimal(Decimal(rating).quantize(
+        Decimal('.001'), rounding=ROUND_HALF_UP))
 
-    for _ in range(num_queries):
-        item, user, mode, k = map(int, sys.stdin.readline().rstrip().split())
-        rating = cf.predict_rating(item - 1, user - 1, k, mode)
 
-        print(Decimal(Decimal(rating).quantize(
-            Decimal('.001'), rounding=ROUND_HALF_UP)))
+def handle_query(cf, query):
+    """Answers a single "I J T K" query of a query server."""
+    return str(answer_query(cf, *map(int, query.split())))
 
 
 if __name__ == '__main__':
-    handle_queries(CollaborativeFiltering(*parse_ratings()))
+    parser = argparse.ArgumentParser(
+        description='Predicts ratings with item-item and user-user '
+                    'collaborative filtering.')
+    queryserver.add_serve_argument(parser)
+    parser.add_argument('--approximate', action='store_true',
+                        help='compare only the candidate pairs of cosine LSH')
+    parser.add_argument('--threshold', type=float,
+                        help='the Pearson similarity which LSH should find '
+                             'with 95%% probability')
+    parser.add_argument('--bands', type=int,
+                        help='the number of LSH bands (instead of '
+                             '--threshold)')
+    parser.add_argument('--rows-per-band', type=int,
+                        help='the number of signature bits per LSH band '
+                             '(instead of --threshold)')
+    parser.add_argument('--recall', type=int, metavar='K',
+                        help='print the recall of the approximate K most '
+                             'similar items and users to stderr')
+    args = parser.parse_args()
+    path = args.serve
+
+    if args.recall and not args.approximate:
+        parser.error('--recall requires --approximate')
+
+    if (args.bands is None) != (args.rows_per_band is None):
+        parser.error('--bands and --rows-per-band must be given together')
+
+    if (args.approximate and args.threshold is None
+            and args.bands is None):
+        parser.error('--approximate requires --threshold or --bands and '
+                     '--rows-per-band')
+
+    cf = CollaborativeFiltering(*parse_ratings(), args.approximate,
+                                args.threshold, args.bands,
+                                args.rows_per_band)
+
+    if args.approximate and args.recall:
+        item_recall, user_recall = cf.recall(args.recall)
+        print(f'item-item recall@{args.recall}: {item_recall:.4f}\n'
+              f'user-user recall@{args.recall}: {user_recall:.4f}',
+              file=sys.stderr)
+
+    if path is None:
+        handle_queries(cf)
+    else:
+        queryserver.serve(lambda query: handle_query(cf, query), path)
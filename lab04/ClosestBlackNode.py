@@ -1,6 +1,14 @@
+import os
 import sys
 from collections import defaultdict, deque
 
+import numpy as np
+
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)),
+                             os.pardir, 'common'))
+from fastio import stdin, stdout  # noqa: E402
+from instrument import metrics  # noqa: E402
+
 
 def closest_black_node(node, adj_matrix, black_nodes):
     """
@@ -40,10 +48,14 @@ def closest_black_node(node, adj_matrix, black_nodes):
             level_size -= 1
 
         if min_black_index != len(adj_matrix):
+            metrics.observe('closest_black_node.visited', len(visited))
+            metrics.observe('closest_black_node.distance', distance)
             return min_black_index, distance
 
         distance += 1
 
+    metrics.observe('closest_black_node.visited', len(visited))
+    metrics.count('closest_black_node.unreachable')
     return -1, -1
 
 
@@ -57,15 +69,9 @@ def parse_node_colors(num_nodes):
     :param num_nodes: the number of nodes in the graph
     :return: a set of black node indices
     """
-    black_nodes = set()
-
-    for node in range(num_nodes):
-        color = int(sys.stdin.readline().rstrip())
-
-        if color == 1:
-            black_nodes.add(node)
+    colors = stdin().read_int_table(num_nodes).ravel()
 
-    return black_nodes
+    return set(np.flatnonzero(colors == 1).tolist())
 
 
 def parse_edges(num_edges):
@@ -80,9 +86,7 @@ def parse_edges(num_edges):
     """
     adj_matrix = defaultdict(list)
 
-    for _ in range(num_edges):
-        node_1, node_2 = map(int, sys.stdin.readline().rstrip().split())
-
+    for node_1, node_2 in stdin().read_int_table(num_edges).tolist():
         adj_matrix[node_1].append(node_2)
         adj_matrix[node_2].append(node_1)
 
@@ -90,11 +94,12 @@ def parse_edges(num_edges):
 
 
 if __name__ == '__main__':
-    num_nodes, num_edges = map(int, sys.stdin.readline().rstrip().split())
+    num_nodes, num_edges = map(int, stdin().readline().split())
 
     black_nodes = parse_node_colors(num_nodes)
     adj_matrix = parse_edges(num_edges)
+    writer = stdout()
 
     for node in range(num_nodes):
         closest, distance = closest_black_node(node, adj_matrix, black_nodes)
-        print(f'{closest} {distance}')
+        writer.print(f'{closest} {distance}')
@@ -1,9 +1,16 @@
+import os
 import sys
 from decimal import Decimal, ROUND_HALF_UP
 
 import numpy as np
 from scipy.sparse import csc_matrix
 
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)),
+                             os.pardir, 'common'))
+from fastio import stdin, stdout  # noqa: E402
+from instrument import metrics  # noqa: E402
+import queryserver  # noqa: E402
+
 
 class NodeRank:
     """The NodeRank algorithm class."""
@@ -36,18 +43,23 @@ class NodeRank:
         :return: the rank vector
         """
         if max_iter <= len(self.r_stored) - 1:
+            metrics.count('node_rank.stored_results')
             return self.r_stored[max_iter]
 
         r = self.r_stored[-1]
 
-        for _ in range(len(self.r_stored) - 1, max_iter):
-            r_next = beta * (self.M @ r) + self.teleport_probs
-            self.r_stored.append(r_next)
+        with metrics.timer('node_rank.iterations'):
+            for _ in range(len(self.r_stored) - 1, max_iter):
+                r_next = self.beta * (self.M @ r) + self.teleport_probs
+                self.r_stored.append(r_next)
+                metrics.count('node_rank.iterations')
 
-            if np.abs(r_next - r).sum() <= self.eps:
-                return r_next
+                if np.abs(r_next - r).sum() <= self.eps:
+                    metrics.observe('node_rank.iterations_until_eps',
+                                    len(self.r_stored) - 1)
+                    return r_next
 
-            r = r_next
+                r = r_next
 
         return r
 
@@ -61,16 +73,9 @@ def parse_M(num_nodes):
 
     :return: the parsed M matrix in scipy.sparse.crc_matrix form
     """
-    indptr = [0]
-    indices = []
-    data = []
-
-    for node in range(num_nodes):
-        adj_nodes = list(map(int, sys.stdin.readline().rstrip().split()))
-
-        indices += adj_nodes
-        data += [1. / len(adj_nodes)] * len(adj_nodes)
-        indptr.append(len(indices))
+    indices, indptr = stdin().read_ragged_rows(num_nodes)
+    out_degrees = np.diff(indptr)
+    data = np.repeat(1. / out_degrees, out_degrees)
 
     return csc_matrix((data, indices, indptr), shape=(num_nodes, num_nodes))
 
@@ -85,19 +90,34 @@ def handle_queries(node_rank):
 
     :param node_rank: the NodeRank instance to use
     """
-    num_queries = int(sys.stdin.readline().rstrip())
+    reader, writer = stdin(), stdout()
+    num_queries = int(reader.readline())
+
+    for node, max_iter in reader.read_int_table(num_queries).tolist():
+        writer.print(answer_query(node_rank, node, max_iter))
 
-    for _ in range(num_queries):
-        node, max_iter = map(int, sys.stdin.readline().rstrip().split())
-        r = node_rank.run(max_iter)
 
-        print(Decimal(Decimal(r[node]).quantize(
-            Decimal('.0000000001'), rounding=ROUND_HALF_UP)))
+def answer_query(node_rank, node, max_iter):
+    """Returns the rounded rank of a node for a "node max_iter" query."""
+    r = node_rank.run(max_iter)
+
+    return Decimal(Decimal(r[node]).quantize(
+        Decimal('.0000000001'), rounding=ROUND_HALF_UP))
+
+
+def handle_query(node_rank, query):
+    """Answers a single "node max_iter" query of a query server."""
+    return str(answer_query(node_rank, *map(int, query.split())))
 
 
 if __name__ == '__main__':
-    line_parts = sys.stdin.readline().rstrip().split()
+    path = queryserver.socket_path('Ranks graph nodes with NodeRank.')
+
+    line_parts = stdin().readline().split()
     num_nodes, beta = int(line_parts[0]), float(line_parts[1])
     node_rank = NodeRank(num_nodes, beta, parse_M(num_nodes))
 
-    handle_queries(node_rank)
+    if path is None:
+        handle_queries(node_rank)
+    else:
+        queryserver.serve(lambda query: handle_query(node_rank, query), path)
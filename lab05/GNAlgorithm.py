@@ -1,9 +1,23 @@
+import argparse
+import ctypes
+import os
 import sys
+import heapq
 from collections import defaultdict
 from collections.abc import MutableMapping
+from concurrent.futures import ProcessPoolExecutor
+from contextlib import nullcontext
 from copy import deepcopy
+from multiprocessing.sharedctypes import RawArray
 
 import numpy as np
+from scipy.sparse import coo_matrix
+from scipy.sparse.csgraph import connected_components
+
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)),
+                             os.pardir, 'common'))
+from fastio import parse_ints, stdin, stdout  # noqa: E402
+from instrument import metrics  # noqa: E402
 
 
 class Graph:
@@ -56,6 +70,32 @@ class Graph:
         """Returns a copy of this graph."""
         return Graph(deepcopy(self.edges), deepcopy(self.adj_matrix))
 
+    def subgraph(self, nodes):
+        """
+        Returns the subgraph induced by the given nodes.
+
+        The nodes keep the order they have in this graph. Adjacency entries
+        are kept even if their edge was removed (an edge given in both
+        directions leaves one entry behind), as communities rely on them.
+
+        :param nodes: a set of nodes of this graph
+        :return: the induced subgraph
+        """
+        edges = UnorderedTupleKeyDict()
+        adj_matrix = {}
+
+        for node in self.nodes:
+            if node not in nodes:
+                continue
+
+            adj_matrix[node] = [n for n in self.adjacent(node) if n in nodes]
+
+            for adj_node in adj_matrix[node]:
+                if (node, adj_node) in self.edges:
+                    edges[node, adj_node] = self.edges[node, adj_node]
+
+        return Graph(edges, adj_matrix)
+
     @staticmethod
     def from_stdin():
         """Creates a Graph by reading edges and properties from sys.stdin."""
@@ -84,7 +124,7 @@ class Graph:
         adj_matrix = defaultdict(list)
 
         while True:
-            line = sys.stdin.readline().rstrip()
+            line = stdin().readline().rstrip()
             if not line:
                 break
 
@@ -111,7 +151,7 @@ class Graph:
         properties = {}
 
         while True:
-            line = sys.stdin.readline().rstrip()
+            line = stdin().readline().rstrip()
             if not line:
                 break
 
@@ -157,26 +197,237 @@ class UnorderedTupleKeyDict(MutableMapping):
         return UnorderedTupleKeyDict(dict.fromkeys(iterable, value))
 
 
-def girvan_newmann(graph):
+class CompactGraph:
+    """
+    Models a graph with dense integer node and edge ids.
+
+    Edges are stored as endpoint and weight arrays indexed by edge id and
+    adjacency is kept in CSR form. Removing an edge only clears its entry in
+    the alive-edge mask, so removal is O(1) and a copy only copies the mask.
+
+    An edge given more than once (e.g. as both "1 4" and "4 1") is stored
+    once with its count. Like the adjacency lists of Graph, such an edge
+    counts once per occurrence in node degrees and keeps its nodes in one
+    community even after it is removed.
+    """
+    WEIGHT_CHUNK_SIZE = 1 << 16
+
+    def __init__(self, labels, endpoints, weights, csr=None, alive=None,
+                 counts=None):
+        """
+        Initializes a CompactGraph instance.
+
+        :param labels: an array of original node labels indexed by node id
+        :param endpoints: a (num_edges, 2) array of edge node ids
+        :param weights: an array of edge weights indexed by edge id
+        :param csr: the (indptr, adj_nodes, adj_edges) CSR adjacency arrays,
+                    built from endpoints if not given
+        :param alive: a boolean mask of edges that were not removed
+        :param counts: the number of times each edge was given (default: 1)
+        """
+        self.labels = np.asarray(labels)
+        self.endpoints = np.asarray(endpoints, dtype=np.int64).reshape(-1, 2)
+        self.weights = np.asarray(weights, dtype=float)
+
+        if csr is None:
+            csr = self._build_csr()
+        self.indptr, self.adj_nodes, self.adj_edges = csr
+
+        if alive is None:
+            alive = np.ones(len(self.weights), dtype=bool)
+        self.alive = alive
+        self.num_edges = int(alive.sum())
+
+        if counts is None:
+            counts = np.ones(len(self.weights), dtype=np.int64)
+        self.counts = np.asarray(counts, dtype=np.int64)
+
+    @property
+    def num_nodes(self):
+        """Returns the number of nodes."""
+        return len(self.labels)
+
+    def _build_csr(self):
+        """Builds the CSR adjacency arrays from the edge endpoints."""
+        num_edges = len(self.endpoints)
+        nodes = np.concatenate([self.endpoints[:, 0], self.endpoints[:, 1]])
+        adj_nodes = np.concatenate([self.endpoints[:, 1],
+                                    self.endpoints[:, 0]])
+        adj_edges = np.tile(np.arange(num_edges), 2)
+
+        order = np.argsort(nodes, kind='stable')
+        indptr = np.zeros(self.num_nodes + 1, dtype=np.int64)
+        np.cumsum(np.bincount(nodes, minlength=self.num_nodes),
+                  out=indptr[1:])
+
+        return indptr, adj_nodes[order], adj_edges[order]
+
+    def remove_edge(self, edge_id):
+        """Removes the edge with the given id from the graph."""
+        if self.alive[edge_id]:
+            self.alive[edge_id] = False
+            self.num_edges -= 1
+
+    def alive_edges(self):
+        """Returns an array of ids of edges that were not removed."""
+        return np.flatnonzero(self.alive)
+
+    def components(self):
+        """
+        Labels the graph communities (connected node groups).
+
+        :return: the number of communities and an int array of node labels
+        """
+        # a removed edge given more than once still links its nodes
+        edges = self.endpoints[self.alive | (self.counts > 1)]
+        matrix = coo_matrix((np.ones(len(edges)), (edges[:, 0], edges[:, 1])),
+                            shape=(self.num_nodes, self.num_nodes))
+
+        return connected_components(matrix, directed=False)
+
+    def communities(self, component_labels):
+        """
+        Groups original node labels by their community.
+
+        :param component_labels: an int array of node community labels
+        :return: a list of communities (lists of original node labels)
+        """
+        order = np.argsort(component_labels, kind='stable')
+        bounds = np.flatnonzero(np.diff(component_labels[order])) + 1
+
+        return [self.labels[ids].tolist() for ids in np.split(order, bounds)]
+
+    def copy(self):
+        """Returns a copy of this graph sharing the immutable arrays."""
+        return CompactGraph(self.labels, self.endpoints, self.weights,
+                            (self.indptr, self.adj_nodes, self.adj_edges),
+                            self.alive.copy(), self.counts)
+
+    @staticmethod
+    def from_graph(graph):
+        """Creates a CompactGraph from a Graph."""
+        labels = list(graph.nodes)
+        node_index = {node: i for i, node in enumerate(labels)}
+        endpoints = []
+        weights = []
+        counts = []
+
+        for edge, weight in graph.edges.items():
+            node_1, *rest = edge
+            node_2 = rest[0] if rest else node_1
+
+            endpoints.append((node_index[node_1], node_index[node_2]))
+            weights.append(weight)
+
+            # a self-loop is listed twice in its node's adjacency list
+            count = list(graph.adjacent(node_1)).count(node_2)
+            counts.append(max(count // (2 if node_1 == node_2 else 1), 1))
+
+        return CompactGraph(labels, np.array(endpoints, dtype=np.int64),
+                            weights, counts=counts)
+
+    @staticmethod
+    def from_stdin():
+        """
+        Creates a CompactGraph by reading edges and properties from sys.stdin.
+
+        The input format is the same as for Graph.from_stdin, but the input is
+        parsed in bulk and all edge weights are computed in one vectorized
+        comparison of node property vectors.
+        """
+        reader = stdin()
+        edges, counts = CompactGraph._parse_edges(reader.read_until_blank())
+        nodes, properties = CompactGraph._parse_properties(
+            reader.read_until_blank())
+
+        labels = np.union1d(edges.ravel(), nodes)
+        endpoints = np.searchsorted(labels, edges)
+
+        property_matrix = np.zeros((len(labels), properties.shape[1]),
+                                   dtype=properties.dtype)
+        property_matrix[np.searchsorted(labels, nodes)] = properties
+
+        # update weights using node properties
+        max_similarity = properties.shape[1]
+        similarities = np.empty(len(endpoints), dtype=np.int64)
+
+        for start in range(0, len(endpoints), CompactGraph.WEIGHT_CHUNK_SIZE):
+            chunk = endpoints[start:start + CompactGraph.WEIGHT_CHUNK_SIZE]
+            similarities[start:start + len(chunk)] = np.count_nonzero(
+                property_matrix[chunk[:, 0]] == property_matrix[chunk[:, 1]],
+                axis=1)
+
+        return CompactGraph(labels, endpoints,
+                            max_similarity - similarities + 1, counts=counts)
+
+    @staticmethod
+    def _parse_edges(text):
+        """
+        Parses graph edges from lines of two integers separated by a
+        whitespace. Duplicate edges are kept once.
+
+        :param text: the edge lines (bytes)
+        :return: a (num_edges, 2) array of node labels and an array of the
+                 number of times each edge was given
+        """
+        edges = parse_ints(text).reshape(-1, 2)
+
+        return np.unique(np.sort(edges, axis=1), axis=0, return_counts=True)
+
+    @staticmethod
+    def _parse_properties(text):
+        """
+        Parses node properties from lines of integers separated by a
+        whitespace, where the first integer is the node label.
+
+        :param text: the property lines (bytes)
+        :return: an array of node labels and a 2D array of property vectors
+        :raises ValueError: if the lines have different numbers of integers
+        """
+        widths = {len(line.split()) for line in text.splitlines()} - {0}
+        if len(widths) > 1:
+            raise ValueError('All node property lines must have the same '
+                             'number of properties')
+
+        table = parse_ints(text).reshape(-1, widths.pop() if widths else 1)
+
+        return table[:, 0], table[:, 1:]
+
+
+def girvan_newmann(graph, incremental=True):
     """
     Implements the Girvan-Newmann algorithm.
 
+    In incremental mode, edge betweenness is cached for each community and
+    only the communities touched by the removed edges are recomputed.
+
     :param graph: the Graph instance
+    :param incremental: if True, reuse betweenness of unaffected communities
     :return: the best found communities based on modularity
     """
-    graph_copy = graph.copy()
+    modularity_calculator = ModularityCalculator.from_graph(graph)
     best_modularity = None
     best_communities = None
+    betweenness_cache = {}
 
     while graph.edges:
-        communities = tuple(graph.communities())
-        modularity = calculate_modularity(communities, graph_copy)
+        metrics.count('gn.iterations')
+
+        with metrics.timer('gn.communities'):
+            communities = tuple(graph.communities())
+        with metrics.timer('gn.modularity'):
+            modularity = modularity_calculator.calculate(communities)
 
         if best_modularity is None or modularity > best_modularity:
             best_communities = communities
             best_modularity = modularity
 
-        edge_betweenness = calculate_betweenness(graph)
+        with metrics.timer('gn.betweenness'):
+            if incremental:
+                edge_betweenness = cached_betweenness(graph, communities,
+                                                      betweenness_cache)
+            else:
+                edge_betweenness = calculate_betweenness(graph)
 
         max_betweenness = max(edge_betweenness.values())
         edges_to_remove = [sorted(list(e)) for e, b in edge_betweenness.items()
@@ -184,53 +435,226 @@ def girvan_newmann(graph):
 
         # print sorted edges_to_remove
         edges_to_remove.sort(key=lambda e: (e[0], e[1]))
-        for e in edges_to_remove:
-            print(*e)
+        print_edges(edges_to_remove)
+        metrics.observe('gn.removed_edges', len(edges_to_remove))
 
         for edge in edges_to_remove:
             graph.remove_edge(edge)
 
-    # print sorted best_communities
-    sorted_best_communities = [sorted(c) for c in best_communities]
-    sorted_best_communities.sort(key=lambda c: (len(c), c[0]))
-    print(' '.join(map(lambda c: '-'.join(map(str, c)), sorted_best_communities)))
+        if incremental:
+            invalidate_betweenness(betweenness_cache, edges_to_remove)
+
+    print_communities(best_communities)
 
     return best_communities
 
 
-def calculate_modularity(communities, graph):
+def girvan_newmann_compact(graph, incremental=True, num_workers=1,
+                           num_pivots=None, seed=None):
     """
-    Computes the modularity for the given communities.
+    Implements the Girvan-Newmann algorithm on a CompactGraph.
 
-    :param communities: the communities
-    :param graph: the Graph instance
+    Edge betweenness is computed with Brandes' algorithm. In incremental
+    mode, only the communities containing the removed edges are recomputed.
+
+    :param graph: the CompactGraph instance
+    :param incremental: if True, reuse betweenness of unaffected communities
+    :param num_workers: the number of worker processes (1 runs in-process)
+    :param num_pivots: if given, approximate betweenness from this many
+                       sampled sources per community (see sample_pivots)
+    :param seed: the seed for sampling pivots
+    :return: the best found communities based on modularity
     """
-    def ij_connected():
-        """Returns True if the nodes i and j are in the same community."""
-        for community in communities:
-            if i not in community and j not in community:
-                continue
+    modularity_calculator = ModularityCalculator(
+        graph.num_nodes, graph.endpoints, graph.weights, counts=graph.counts)
+    graph = graph.copy()
+    best_modularity = None
+    best_labels = None
+
+    betweenness = np.zeros(len(graph.weights))
+    removed = None
+
+    rng = np.random.default_rng(seed)
+    # the workers are shut down even if an exception is raised
+    pool = (betweenness_pool(graph, num_workers) if num_workers > 1
+            else nullcontext())
+
+    with pool as executor:
+        while graph.num_edges:
+            metrics.count('gn.iterations')
+
+            with metrics.timer('gn.communities'):
+                _, labels = graph.components()
+            with metrics.timer('gn.modularity'):
+                modularity = modularity_calculator.calculate_from_labels(
+                    labels)
+
+            if best_modularity is None or modularity > best_modularity:
+                best_labels = labels
+                best_modularity = modularity
+
+            if incremental and removed is not None:
+                affected = np.isin(labels,
+                                   labels[graph.endpoints[removed].ravel()])
+                betweenness[affected[graph.endpoints[:, 0]]] = 0.0
+                sources = np.flatnonzero(affected)
+            else:
+                betweenness[:] = 0.0
+                sources = np.arange(graph.num_nodes)
+
+            metrics.observe('gn.betweenness_sources', len(sources))
+            with metrics.timer('gn.betweenness'):
+                betweenness += estimate_betweenness(graph, labels, sources,
+                                                    executor, num_pivots, rng)
+
+            alive = graph.alive_edges()
+            rounded = [round(b / 2.0, 4) for b in betweenness[alive].tolist()]
+            max_betweenness = max(rounded)
+            removed = alive[[b == max_betweenness for b in rounded]]
+
+            edges_to_remove = sorted(
+                sorted(graph.labels[graph.endpoints[e]].tolist())
+                for e in removed)
+            print_edges(edges_to_remove)
+            metrics.observe('gn.removed_edges', len(edges_to_remove))
+
+            for edge_id in removed:
+                graph.remove_edge(edge_id)
+
+    best_communities = graph.communities(best_labels)
+    print_communities(best_communities)
+
+    return best_communities
+
+
+def print_edges(edges):
+    """Prints the given edges, one per line."""
+    writer = stdout()
+
+    for e in edges:
+        writer.print(*e)
+
+
+def print_communities(communities):
+    """Prints the communities sorted by size and their smallest node."""
+    sorted_communities = [sorted(c) for c in communities]
+    sorted_communities.sort(key=lambda c: (len(c), c[0]))
+    stdout().print(' '.join(map(lambda c: '-'.join(map(str, c)), sorted_communities)))
+
+
+class ModularityCalculator:
+    """
+    Computes the modularity of graph communities.
+
+    Weighted node degrees and the total edge weight are computed once, so each
+    modularity calculation takes O(E + N) time.
+    """
+
+    def __init__(self, num_nodes, endpoints, weights, node_index=None,
+                 counts=None):
+        """
+        Initializes a ModularityCalculator instance.
+
+        :param num_nodes: the number of nodes (node ids are 0..num_nodes-1)
+        :param endpoints: a (num_edges, 2) array of edge node ids
+        :param weights: an array of edge weights
+        :param node_index: a dict mapping graph nodes to node ids
+        :param counts: the number of times each edge was given (default: 1)
+        """
+        self.num_nodes = num_nodes
+        self.endpoints = np.asarray(endpoints, dtype=int).reshape(-1, 2)
+        self.node_index = node_index
+
+        weights = np.asarray(weights, dtype=float)
+        is_loop = self.endpoints[:, 0] == self.endpoints[:, 1]
+
+        # a self-loop is counted once in the sum over (i, j), other edges twice
+        self.internal_weights = np.where(is_loop, 1.0, 2.0) * weights
+        # an edge given k times adds k times its weight to the degrees, as
+        # its nodes are listed k times in each other's adjacency lists
+        degree_weights = weights if counts is None else weights * counts
+        self.degrees = np.bincount(self.endpoints.ravel(),
+                                   weights=np.repeat(degree_weights, 2),
+                                   minlength=num_nodes)
+        self.total_weight_doubled = weights.sum() * 2
 
-            return i in community and j in community
+    @staticmethod
+    def from_graph(graph):
+        """Creates a ModularityCalculator for the given Graph."""
+        node_index = {node: i for i, node in enumerate(graph.nodes)}
+        endpoints = []
+        weights = []
+
+        for edge, weight in graph.edges.items():
+            node_1, *rest = edge
+            node_2 = rest[0] if rest else node_1
+
+            endpoints.append((node_index[node_1], node_index[node_2]))
+            weights.append(weight)
+
+        calculator = ModularityCalculator(len(node_index), endpoints, weights,
+                                          node_index)
+
+        # degrees follow the adjacency lists, so an edge given in both
+        # directions counts twice and a removed one not at all, as in the
+        # original modularity formula
+        calculator.degrees = np.array(
+            [sum(graph.edges.get((node, adj_node), 0.0)
+                 for adj_node in graph.adjacent(node))
+             for node in node_index], dtype=float)
+
+        return calculator
 
-    total = 0.0
-    total_weight_doubled = sum(graph.edges.values()) * 2
+    def calculate(self, communities):
+        """
+        Computes the modularity for the given communities.
+
+        :param communities: the communities (sets of graph nodes)
+        :return: the modularity
+        """
+        labels = np.empty(self.num_nodes, dtype=int)
 
-    for i in graph.nodes:
-        for j in graph.nodes:
-            weight_ij = graph.edges.get((i, j), 0.0)
-            weight_i = sum(graph.edges.get((i, k), 0.0) for k in graph.adjacent(i))
-            weight_k = sum(graph.edges.get((j, k), 0.0) for k in graph.adjacent(j))
+        for label, community in enumerate(communities):
+            labels[[self.node_index[node] for node in community]] = label
 
-            total += ((weight_ij - (weight_i * weight_k) / total_weight_doubled)
-                      * ij_connected())
+        return self.calculate_from_labels(labels)
 
-    modularity = total / total_weight_doubled
+    def calculate_from_labels(self, labels):
+        """
+        Computes the modularity for the given community labels.
+
+        :param labels: an int array where labels[i] is the community of node i
+        :return: the modularity
+        """
+        same_community = (labels[self.endpoints[:, 0]]
+                          == labels[self.endpoints[:, 1]])
+        internal_weight = self.internal_weights[same_community].sum()
+        degree_sums = np.bincount(labels, weights=self.degrees)
 
+        # a single division keeps the result exact for integer weights, so
+        # equal modularities always compare equal
+        total = (internal_weight * self.total_weight_doubled
+                 - (degree_sums ** 2).sum())
+
+        return round_modularity(total / self.total_weight_doubled ** 2)
+
+
+def round_modularity(modularity):
+    """Rounds the modularity to 4 decimals, flushing near-zero values to 0."""
     if abs(modularity) < 1e-5:
         modularity = 0.0
 
-    return round(modularity, 4)
+    return round(float(modularity), 4)
+
+
+def calculate_modularity(communities, graph):
+    """
+    Computes the modularity for the given communities.
+
+    :param communities: the communities
+    :param graph: the Graph instance
+    """
+    return ModularityCalculator.from_graph(graph).calculate(communities)
 
 
 def calculate_betweenness(graph):
@@ -240,13 +664,16 @@ def calculate_betweenness(graph):
     :param graph: the Graph instance
     :return: the edge betweenness dict
     """
-    successors = floyd_warshall(graph)
+    with metrics.timer('gn.floyd_warshall'):
+        successors = floyd_warshall(graph)
+
     centralities = UnorderedTupleKeyDict.fromkeys(graph.edges, 0.0)
 
-    for i in graph.nodes:
-        for j in graph.nodes:
-            paths = list(shortest_paths(successors, i, j))
-            update_centralities(paths, centralities)
+    with metrics.timer('gn.path_enumeration'):
+        for i in graph.nodes:
+            for j in graph.nodes:
+                paths = list(shortest_paths(successors, i, j))
+                update_centralities(paths, centralities)
 
     for key, centrality in centralities.items():
         centralities[key] = round(centrality / 2.0, 4)
@@ -254,6 +681,46 @@ def calculate_betweenness(graph):
     return centralities
 
 
+def cached_betweenness(graph, communities, cache):
+    """
+    Calculates edge betweenness community by community.
+
+    Shortest paths never leave a community, so the betweenness of a community
+    depends only on its own edges. Communities missing from the cache are
+    computed on their induced subgraph and stored in the cache.
+
+    :param graph: the Graph instance
+    :param communities: the communities (connected node groups) of graph
+    :param cache: a dict of community (frozenset) -> edge betweenness dict
+    :return: the edge betweenness dict
+    """
+    centralities = UnorderedTupleKeyDict()
+
+    for community in communities:
+        key = frozenset(community)
+
+        if key not in cache:
+            cache[key] = calculate_betweenness(graph.subgraph(community))
+            metrics.count('gn.recomputed_communities')
+
+        centralities.update(cache[key])
+
+    return centralities
+
+
+def invalidate_betweenness(cache, removed_edges):
+    """
+    Removes cached betweenness of communities containing the removed edges.
+
+    :param cache: a dict of community (frozenset) -> edge betweenness dict
+    :param removed_edges: the edges removed from the graph
+    """
+    touched_nodes = {edge[0] for edge in removed_edges}
+
+    for key in [c for c in cache if not touched_nodes.isdisjoint(c)]:
+        del cache[key]
+
+
 def floyd_warshall(graph):
     """
     Implements the Floyd-Warshall algorithm for weighted undirected graphs.
@@ -329,5 +796,209 @@ def update_centralities(paths, centralities):
             centralities[i, j] += centrality_coeff
 
 
+def brandes_betweenness(graph, sources=None):
+    """
+    Accumulates edge betweenness from the given sources with Brandes'
+    algorithm for weighted graphs.
+
+    Each unordered node pair is counted from both of its nodes, so the values
+    are twice the edge betweenness when all nodes are sources.
+
+    :param graph: the CompactGraph instance
+    :param sources: node ids to start shortest paths from (default: all)
+    :return: an array of accumulated betweenness indexed by edge id
+    """
+    if sources is None:
+        sources = range(graph.num_nodes)
+
+    indptr = graph.indptr.tolist()
+    adj_nodes = graph.adj_nodes.tolist()
+    adj_edges = graph.adj_edges.tolist()
+    weights = graph.weights.tolist()
+    alive = graph.alive.tolist()
+
+    centralities = [0.0] * len(weights)
+
+    for source in sources:
+        distances = {source: 0.0}
+        num_paths = {source: 1.0}
+        predecessors = {source: []}
+        settled = []
+        queue = [(0.0, source)]
+
+        while queue:
+            distance, node = heapq.heappop(queue)
+            if distance > distances[node]:
+                continue
+            settled.append(node)
+
+            for slot in range(indptr[node], indptr[node + 1]):
+                edge = adj_edges[slot]
+                adj_node = adj_nodes[slot]
+                if not alive[edge] or adj_node == node:
+                    continue
+
+                adj_distance = distance + weights[edge]
+                known_distance = distances.get(adj_node)
+
+                if known_distance is None or adj_distance < known_distance:
+                    distances[adj_node] = adj_distance
+                    num_paths[adj_node] = num_paths[node]
+                    predecessors[adj_node] = [(node, edge)]
+                    heapq.heappush(queue, (adj_distance, adj_node))
+                elif adj_distance == known_distance:
+                    num_paths[adj_node] += num_paths[node]
+                    predecessors[adj_node].append((node, edge))
+
+        dependencies = dict.fromkeys(settled, 0.0)
+
+        for node in reversed(settled):
+            coeff = (1.0 + dependencies[node]) / num_paths[node]
+
+            for predecessor, edge in predecessors[node]:
+                centrality = num_paths[predecessor] * coeff
+                centralities[edge] += centrality
+                dependencies[predecessor] += centrality
+
+    return np.array(centralities)
+
+
+def estimate_betweenness(graph, component_labels, sources, executor=None,
+                         num_pivots=None, rng=None, chunk_size=64):
+    """
+    Accumulates edge betweenness from the given sources.
+
+    Sources are split into fixed-size chunks whose partial results are summed
+    in chunk order, so the exact result does not depend on the number of
+    workers. With num_pivots, only sampled pivot sources are used and their
+    contributions are scaled up to the size of their community.
+
+    :param graph: the CompactGraph instance
+    :param component_labels: an int array of node community labels
+    :param sources: node ids to start shortest paths from
+    :param executor: an optional executor created by betweenness_pool for
+                     this graph to run the chunks on
+    :param num_pivots: the number of pivots sampled per community, or None
+    :param rng: the numpy random Generator used for sampling pivots
+    :param chunk_size: the number of sources per chunk
+    :return: an array of accumulated betweenness indexed by edge id
+    """
+    scales = None
+    if num_pivots is not None:
+        sources, scales = sample_pivots(component_labels, sources,
+                                        num_pivots, rng)
+
+    chunks = [sources[i:i + chunk_size]
+              for i in range(0, len(sources), chunk_size)]
+
+    if executor is None:
+        partials = [brandes_betweenness(graph, chunk) for chunk in chunks]
+    else:
+        partials = executor.map(_worker_betweenness, chunks)
+
+    betweenness = np.zeros(len(graph.weights))
+    for partial in partials:
+        betweenness += partial
+
+    if scales is not None:
+        betweenness *= scales[component_labels[graph.endpoints[:, 0]]]
+
+    return betweenness
+
+
+def betweenness_pool(graph, num_workers):
+    """
+    Creates a pool of worker processes for estimate_betweenness.
+
+    The graph is sent to each worker once, when the worker starts, and tasks
+    only carry their sources. The alive-edge mask of the graph is moved to
+    shared memory, so the workers see the edges removed from it later.
+
+    :param graph: the CompactGraph instance (its alive mask is replaced)
+    :param num_workers: the number of worker processes
+    :return: a ProcessPoolExecutor running betweenness chunks of the graph
+    """
+    shared_alive = RawArray(ctypes.c_bool, len(graph.alive))
+    alive = np.frombuffer(shared_alive, dtype=bool)
+    alive[:] = graph.alive
+    graph.alive = alive
+
+    return ProcessPoolExecutor(num_workers, initializer=_init_worker,
+                               initargs=(graph, shared_alive))
+
+
+# the graph of a betweenness_pool worker process
+_worker_graph = None
+
+
+def _init_worker(graph, shared_alive):
+    """Installs the graph of a worker process with the shared alive mask."""
+    global _worker_graph
+
+    graph.alive = np.frombuffer(shared_alive, dtype=bool)
+    _worker_graph = graph
+
+
+def _worker_betweenness(sources):
+    """Accumulates betweenness from the sources in a worker process."""
+    return brandes_betweenness(_worker_graph, sources)
+
+
+def sample_pivots(component_labels, sources, num_pivots, rng):
+    """
+    Samples at most num_pivots sources from each community uniformly without
+    replacement.
+
+    Scaling the betweenness accumulated from the pivots of a community with
+    n nodes by n / num_pivots gives an unbiased estimate. Each source adds at
+    most n - 1 to an edge, so by Hoeffding's inequality the estimate of an
+    edge's (halved) betweenness is within n * (n - 1) * sqrt(ln(2 / delta) /
+    (8 * num_pivots)) of the exact value with probability at least 1 - delta.
+    Communities with at most num_pivots nodes are computed exactly.
+
+    :param component_labels: an int array of node community labels
+    :param sources: the candidate source node ids
+    :param num_pivots: the number of pivots per community
+    :param rng: the numpy random Generator to sample with
+    :return: the sorted pivot node ids and an array of per-community scales
+    """
+    scales = np.ones(component_labels.max() + 1)
+    sources = np.asarray(sources)
+
+    order = np.argsort(component_labels[sources], kind='stable')
+    groups = np.split(sources[order], np.flatnonzero(
+        np.diff(component_labels[sources[order]])) + 1)
+
+    pivots = []
+    for group in groups:
+        if len(group) > num_pivots:
+            scales[component_labels[group[0]]] = len(group) / num_pivots
+            group = rng.choice(group, num_pivots, replace=False)
+
+        pivots.append(group)
+
+    return np.sort(np.concatenate(pivots)), scales
+
+
 if __name__ == '__main__':
-    girvan_newmann(Graph.from_stdin())
+    parser = argparse.ArgumentParser(
+        description='Finds graph communities with the Girvan-Newmann '
+                    'algorithm.')
+    parser.add_argument('--workers', type=int, default=1,
+                        help='the number of worker processes computing '
+                             'betweenness (default: 1, in-process)')
+    parser.add_argument('--pivots', type=int, metavar='K',
+                        help='approximate betweenness from K sampled source '
+                             'nodes per community')
+    parser.add_argument('--seed', type=int,
+                        help='the seed for sampling pivots')
+    args = parser.parse_args()
+
+    if args.workers < 1:
+        parser.error('--workers must be at least 1')
+    if args.pivots is not None and args.pivots < 1:
+        parser.error('--pivots must be at least 1')
+
+    girvan_newmann_compact(CompactGraph.from_stdin(),
+                           num_workers=args.workers, num_pivots=args.pivots,
+                           seed=args.seed)
@@ -1,10 +1,23 @@
+import argparse
+import os
 import sys
 import math
-from collections import deque
+import signal
+import struct
+from contextlib import contextmanager, nullcontext
+
+import numpy as np
+
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)),
+                             os.pardir, 'common'))
+from fastio import stdout, stream_stdin  # noqa: E402
+from instrument import metrics  # noqa: E402
+import queryserver  # noqa: E402
 
 
 class Bucket:
     """Models a bucket in the DGIM algorithm."""
+    __slots__ = ('timestamp', 'size')
 
     def __init__(self, timestamp, size):
         """
@@ -24,7 +37,22 @@ class DGIM:
     """
     An implementation of the Datar-Gionis-Indyk-Motwani (DGIM) algorithm
     for counting 1's.
+
+    Buckets are stored in levels by size: levels[j] is a small list of the
+    timestamps of buckets of size 2 ** j, oldest first. Every bucket in
+    levels[j] is newer than every bucket in levels[j + 1], so the oldest
+    bucket is the first one in the last level and merges cascade one level
+    at a time.
+
+    The total size of all buckets is kept as a running total. The total
+    size of the levels below level j is num_ones + level_prefixes[j] for
+    j > 0, which stays valid without updates when a 1 is added to level 0.
     """
+    __slots__ = ('window_size', 'timestamp', 'levels', 'level_prefixes',
+                 'total_size', 'num_ones')
+    SNAPSHOT_HEADER = struct.Struct('<4sBqqI')
+    SNAPSHOT_MAGIC = b'DGIM'
+    SNAPSHOT_VERSION = 1
 
     def __init__(self, window_size):
         """
@@ -35,7 +63,17 @@ class DGIM:
         self.window_size = window_size
 
         self.timestamp = 0
-        self.buckets = deque()
+        self.levels = []
+        self.level_prefixes = []
+        self.total_size = 0
+        self.num_ones = 0
+
+    @property
+    def buckets(self):
+        """Returns a list of buckets ordered from oldest to newest."""
+        return [Bucket(timestamp, 1 << size_exp)
+                for size_exp in range(len(self.levels) - 1, -1, -1)
+                for timestamp in self.levels[size_exp]]
 
     def update(self, bit):
         """
@@ -43,81 +81,602 @@ class DGIM:
 
         :param bit: the bit to handle
         """
+        if metrics.enabled:
+            with self._count_merges():
+                self._update(bit)
+        else:
+            self._update(bit)
+
+    def _update(self, bit):
+        """Updates the DGIM buckets with the given bit."""
         self.timestamp += 1
 
-        if self.buckets and self._bucket_is_too_old():
-            self.buckets.popleft()
+        if self.levels and self._bucket_is_too_old():
+            self._remove_oldest_bucket()
 
         if bit == 0:
             return
 
-        self.buckets.append(Bucket(self.timestamp, 1))
-        self._merge_buckets()
+        self._add_bucket(self.timestamp)
+
+    def update_many(self, bits):
+        """
+        Updates the DGIM buckets with a chunk of bits.
+
+        The result is the same as calling update for each bit, but runs of
+        zeros are skipped with a single expiry sweep.
+
+        :param bits: a str or bytes of '0' and '1' characters, or an array
+                     of 0's and 1's
+        :raises ValueError: if bits contains anything other than 0's and 1's
+        """
+        if isinstance(bits, str):
+            bits = bits.encode()
+
+        if isinstance(bits, (bytes, bytearray, memoryview)):
+            chars = np.frombuffer(bits, dtype=np.uint8)
+            bits = chars == ord('1')
+
+            if not (bits | (chars == ord('0'))).all():
+                raise ValueError('Bits must be 0 or 1 characters')
+        else:
+            bits = np.asarray(bits)
+
+            if bits.dtype != bool and not ((bits == 0) | (bits == 1)).all():
+                raise ValueError('Bits must be 0 or 1')
+
+        if metrics.enabled:
+            with self._count_merges():
+                self._update_many(bits)
+        else:
+            self._update_many(bits)
+
+    def _update_many(self, bits):
+        """Updates the DGIM buckets with an array of 0's and 1's."""
+        levels = self.levels
+        window_size = self.window_size
+        start = self.timestamp
+
+        for timestamp in (np.flatnonzero(bits) + start + 1).tolist():
+            if levels and levels[-1][0] <= timestamp - window_size:
+                self.timestamp = timestamp
+                self._remove_old_buckets()
+
+            self._add_bucket(timestamp)
+
+        self.timestamp = start + len(bits)
+        self._remove_old_buckets()
 
     def count_ones(self, k):
         """
         Counts 1's in the last k bits of the stream.
 
+        The last bucket inside the window is found with a binary search over
+        the levels, so a query takes O(log log W) time.
+
         :param k: the number of last bits to check for 1's
         :return: the number of 1's in the last k bits
         """
-        total_size = 0
-        last_bucket_size = 0
+        levels = self.levels
+        oldest_timestamp = self.timestamp - k
 
-        for i in range(len(self.buckets) - 1, -1, -1):
-            if self.buckets[i].timestamp <= self.timestamp - k:
-                break
+        if not levels or levels[0][-1] <= oldest_timestamp:
+            return 0
 
-            total_size += self.buckets[i].size
-            last_bucket_size = self.buckets[i].size
+        if levels[-1][0] > oldest_timestamp:
+            last_bucket_size = 1 << (len(levels) - 1)
+            return self.total_size - int(math.ceil(last_bucket_size / 2.0))
+
+        # find the last level whose newest bucket is inside the window
+        low, high = 0, len(levels) - 1
+        while low < high:
+            mid = (low + high + 1) // 2
+
+            if levels[mid][-1] > oldest_timestamp:
+                low = mid
+            else:
+                high = mid - 1
+
+        last_bucket_size = 1 << low
+        num_inside = sum(t > oldest_timestamp for t in levels[low])
+        total_size = self._size_below(low) + num_inside * last_bucket_size
 
         return total_size - int(math.ceil(last_bucket_size / 2.0))
 
+    def snapshot(self):
+        """
+        Returns the state of this DGIM instance as compact bytes.
+
+        The snapshot holds a header, the number of buckets of each size and
+        the bucket timestamps as little-endian 64-bit integers.
+        """
+        header = self.SNAPSHOT_HEADER.pack(
+            self.SNAPSHOT_MAGIC, self.SNAPSHOT_VERSION, self.window_size,
+            self.timestamp, len(self.levels))
+        counts = bytes(len(level) for level in self.levels)
+        timestamps = np.array([t for level in self.levels for t in level],
+                              dtype='<i8')
+
+        return header + counts + timestamps.tobytes()
+
+    @staticmethod
+    def from_snapshot(data):
+        """
+        Creates a DGIM instance from a snapshot.
+
+        :param data: bytes returned by DGIM.snapshot
+        :return: the restored DGIM instance
+        """
+        header = DGIM.SNAPSHOT_HEADER
+        magic, version, window_size, timestamp, num_levels = \
+            header.unpack_from(data)
+
+        if magic != DGIM.SNAPSHOT_MAGIC or version != DGIM.SNAPSHOT_VERSION:
+            raise ValueError('Not a DGIM snapshot')
+
+        counts = data[header.size:header.size + num_levels]
+        timestamps = np.frombuffer(data, dtype='<i8', count=sum(counts),
+                                   offset=header.size + num_levels).tolist()
+
+        dgim = DGIM(window_size)
+        dgim.timestamp = timestamp
+
+        start = 0
+        for size_exp, count in enumerate(counts):
+            dgim.levels.append(timestamps[start:start + count])
+            dgim.level_prefixes.append(dgim.total_size)
+            dgim.total_size += count << size_exp
+            start += count
+
+        return dgim
+
+    def _size_below(self, size_exp):
+        """Returns the total size of buckets smaller than 2 ** size_exp."""
+        if size_exp == 0:
+            return 0
+
+        return self.num_ones + self.level_prefixes[size_exp]
+
     def _bucket_is_too_old(self):
-        """Returns True if bucket is too old and should be removed."""
-        return self.buckets[0].timestamp <= (self.timestamp - self.window_size)
+        """Returns True if the oldest bucket is too old and should be removed."""
+        return self.levels[-1][0] <= (self.timestamp - self.window_size)
+
+    @contextmanager
+    def _count_merges(self):
+        """
+        Adds the number of bucket merges of the enclosed updates to the
+        'dgim.merges' counter.
+
+        Merges are not counted in _add_bucket itself, which would slow down
+        the hottest loop even with instrumentation disabled. Every new bucket
+        either still exists, was merged away or expired, so the merges follow
+        from the bucket counts.
+        """
+        num_buckets = sum(map(len, self.levels))
+        num_ones = self.num_ones
+        num_expired = metrics.counters['dgim.expired_buckets']
+
+        yield
+
+        metrics.count('dgim.merges',
+                      self.num_ones - num_ones
+                      - (sum(map(len, self.levels)) - num_buckets)
+                      - (metrics.counters['dgim.expired_buckets']
+                         - num_expired))
+
+    def _remove_old_buckets(self):
+        """Removes all buckets that are too old."""
+        while self.levels and self._bucket_is_too_old():
+            self._remove_oldest_bucket()
+
+    def _remove_oldest_bucket(self):
+        """Removes the oldest bucket."""
+        oldest_level = self.levels[-1]
+        del oldest_level[0]
+        if metrics.enabled:
+            metrics.count('dgim.expired_buckets')
+        self.total_size -= 1 << (len(self.levels) - 1)
+
+        if not oldest_level:
+            self.levels.pop()
+            self.level_prefixes.pop()
+
+    def _add_bucket(self, timestamp):
+        """Adds a bucket of size 1 and merges buckets if needed."""
+        levels = self.levels
+        self.num_ones += 1
+        self.total_size += 1
+
+        for size_exp, level in enumerate(levels):
+            level.append(timestamp)
+
+            if len(level) < 3:
+                return
+
+            # merge oldest two of the same size, keeping the newer timestamp
+            del level[0]
+            timestamp = level.pop(0)
+
+            if size_exp + 1 < len(levels):
+                self.level_prefixes[size_exp + 1] -= 2 << size_exp
+
+        levels.append([timestamp])
+        self.level_prefixes.append(
+            self.total_size - (1 << (len(levels) - 1)) - self.num_ones)
+
+
+class DGIMSum:
+    """
+    Estimates sums of non-negative integers over a sliding window.
+
+    Each bit of the integers is counted by its own DGIM instance and the
+    counts are weighted by their powers of 2, so the relative error of the
+    sum is bounded by the error of a single DGIM count.
+    """
+    SNAPSHOT_HEADER = struct.Struct('<4sBI')
+    SNAPSHOT_MAGIC = b'DGMS'
+    SNAPSHOT_VERSION = 1
+
+    def __init__(self, window_size, num_bits):
+        """
+        Initializes a DGIMSum instance.
+
+        :param window_size: size of the currently observable stream part
+        :param num_bits: the number of bits of the integers (their maximum
+                         value is 2 ** num_bits - 1)
+        """
+        self.window_size = window_size
+        self.num_bits = num_bits
+        self.planes = [DGIM(window_size) for _ in range(num_bits)]
+
+    def update(self, value):
+        """
+        Updates the DGIM bit planes with the given integer.
 
-    def _merge_index(self):
+        :param value: the integer to handle
         """
-        Returns the index of the newest such bucket if there are 3 buckets
-        of the same size, else None.
+        if not 0 <= value < (1 << self.num_bits):
+            raise ValueError(f'Value {value} does not fit in '
+                             f'{self.num_bits} bits')
+
+        for bit_idx, plane in enumerate(self.planes):
+            plane.update((value >> bit_idx) & 1)
+
+    def update_many(self, values):
+        """
+        Updates the DGIM bit planes with a chunk of integers.
+
+        :param values: an array of integers
+        """
+        values = np.asarray(values, dtype=np.int64)
+
+        if len(values) and (values.min() < 0
+                            or values.max() >= (1 << self.num_bits)):
+            raise ValueError(f'Values do not fit in {self.num_bits} bits')
+
+        for bit_idx, plane in enumerate(self.planes):
+            plane.update_many((values >> bit_idx) & 1)
+
+    def count_sum(self, k):
+        """
+        Estimates the sum of the last k integers of the stream.
+
+        :param k: the number of last integers to sum
+        :return: the estimated sum of the last k integers
+        """
+        return sum(plane.count_ones(k) << bit_idx
+                   for bit_idx, plane in enumerate(self.planes))
+
+    def snapshot(self):
+        """Returns the state of this DGIMSum instance as compact bytes."""
+        parts = [self.SNAPSHOT_HEADER.pack(
+            self.SNAPSHOT_MAGIC, self.SNAPSHOT_VERSION, self.num_bits)]
+
+        for plane in self.planes:
+            plane_snapshot = plane.snapshot()
+            parts.append(struct.pack('<I', len(plane_snapshot)))
+            parts.append(plane_snapshot)
+
+        return b''.join(parts)
+
+    @staticmethod
+    def from_snapshot(data):
+        """
+        Creates a DGIMSum instance from a snapshot.
+
+        :param data: bytes returned by DGIMSum.snapshot
+        :return: the restored DGIMSum instance
+        """
+        data = memoryview(data)
+        header = DGIMSum.SNAPSHOT_HEADER
+        magic, version, num_bits = header.unpack_from(data)
+
+        if (magic != DGIMSum.SNAPSHOT_MAGIC
+                or version != DGIMSum.SNAPSHOT_VERSION):
+            raise ValueError('Not a DGIMSum snapshot')
+
+        planes = []
+        offset = header.size
+
+        for _ in range(num_bits):
+            size, = struct.unpack_from('<I', data, offset)
+            offset += 4
+            planes.append(DGIM.from_snapshot(data[offset:offset + size]))
+            offset += size
+
+        dgim_sum = DGIMSum(planes[0].window_size if planes else 0, num_bits)
+        dgim_sum.planes = planes
+
+        return dgim_sum
+
+
+class DGIMBank:
+    """
+    A bank of DGIM counters for many independent streams.
+
+    Bucket state for all streams is kept in shared NumPy arrays:
+    slots[s, j] holds the timestamps of the buckets of size 2 ** j of stream
+    s (oldest first) and counts[s, j] is their number. Each stream has its
+    own clock which advances with every bit of that stream.
+
+    At most r buckets of each size are kept (DGIM uses r = 2). Every level
+    below the largest then holds at least r - 1 buckets, so an estimate is
+    off by at most max(1, c / r), where c is the true number of 1's.
+    """
+
+    def __init__(self, num_streams, window_size, r=2):
+        """
+        Initializes a DGIMBank instance.
+
+        :param num_streams: the number of streams (stream ids are
+                            0..num_streams-1)
+        :param window_size: size of the currently observable stream part
+        :param r: the maximum number of buckets of the same size
+        """
+        if r < 2:
+            raise ValueError(f'r must be at least 2, got {r}')
+
+        self.num_streams = num_streams
+        self.window_size = window_size
+        self.r = r
+
+        # r buckets of size 2 ** j inside the window need r * 2 ** j <= W
+        self.num_levels = window_size.bit_length() + 1
+
+        self.timestamps = np.zeros(num_streams, dtype=np.int64)
+        # a level holds up to r + 1 buckets before merging
+        self.counts = np.zeros((num_streams, self.num_levels),
+                               dtype=np.min_scalar_type(r + 1))
+        self.slots = np.zeros((num_streams, self.num_levels, r + 1),
+                              dtype=np.int64)
+
+    def update(self, stream_ids, bits):
         """
-        if len(self.buckets) < 3:
+        Updates the streams with a batch of bits.
+
+        Bits of the same stream are applied in the given order.
+
+        :param stream_ids: an array of stream ids
+        :param bits: an array of bits (or a single bit for all streams)
+        """
+        stream_ids = np.asarray(stream_ids, dtype=np.int64).ravel()
+        bits = np.broadcast_to(np.asarray(bits), stream_ids.shape)
+
+        if len(stream_ids) == 0:
             return
 
-        for i in range(len(self.buckets) - 1, 1, -1):
-            curr_size = self.buckets[i].size
-            if (curr_size == self.buckets[i - 1].size
-                    and curr_size == self.buckets[i - 2].size):
-                return i
+        # rank each bit by its position within its stream, so every round
+        # of equally ranked bits touches each stream at most once
+        order = np.argsort(stream_ids, kind='stable')
+        group_starts = np.flatnonzero(
+            np.r_[True, np.diff(stream_ids[order]) != 0])
+        group_sizes = np.diff(np.r_[group_starts, len(order)])
+
+        ranks = np.empty(len(order), dtype=np.int64)
+        ranks[order] = (np.arange(len(order))
+                        - np.repeat(group_starts, group_sizes))
 
-        return
+        by_rank = np.argsort(ranks, kind='stable')
+        round_sizes = np.bincount(ranks)
 
-    def _merge_buckets(self):
-        """Merges buckets if needed."""
-        i = self._merge_index()
+        for idxs in np.split(by_rank, np.cumsum(round_sizes)[:-1]):
+            self._step(stream_ids[idxs], bits[idxs])
 
-        while i is not None:
-            # merge oldest two of the same size
-            self.buckets[i - 1].size += self.buckets[i - 2].size
-            del self.buckets[i - 2]
+    def count_ones(self, stream_ids, k):
+        """
+        Counts 1's in the last k bits of the given streams.
+
+        :param stream_ids: an array of stream ids
+        :param k: the number of last bits to check for 1's (an array or a
+                  single value for all streams)
+        :return: an array with the number of 1's for each stream id
+        """
+        stream_ids = np.asarray(stream_ids, dtype=np.int64).ravel()
+        oldest_timestamps = self.timestamps[stream_ids] - np.asarray(k)
+
+        slots = self.slots[stream_ids]
+        is_bucket = (np.arange(self.r + 1)
+                     < self.counts[stream_ids][:, :, np.newaxis])
+        inside = is_bucket & (slots > oldest_timestamps[:, np.newaxis,
+                                                        np.newaxis])
+
+        level_counts = inside.sum(axis=2)
+        sizes = 1 << np.arange(self.num_levels, dtype=np.int64)
+        total_sizes = level_counts @ sizes
+
+        last_levels = (self.num_levels - 1
+                       - np.argmax(level_counts[:, ::-1] > 0, axis=1))
+        last_bucket_sizes = np.where(level_counts.any(axis=1),
+                                     sizes[last_levels], 0)
+
+        return total_sizes - (last_bucket_sizes + 1) // 2
+
+    def _step(self, stream_ids, bits):
+        """Updates distinct streams with one bit each."""
+        self.timestamps[stream_ids] += 1
+        self._remove_old_buckets(stream_ids)
+
+        ones = stream_ids[bits != 0]
+        if len(ones):
+            self._add_buckets(ones)
+
+    def _remove_old_buckets(self, stream_ids):
+        """Removes the oldest bucket of the streams if it is too old."""
+        counts = self.counts[stream_ids]
+        oldest_levels = (self.num_levels - 1
+                         - np.argmax(counts[:, ::-1] > 0, axis=1))
+        oldest_timestamps = self.slots[stream_ids, oldest_levels, 0]
+
+        too_old = counts.any(axis=1) & (
+            oldest_timestamps
+            <= self.timestamps[stream_ids] - self.window_size)
+        stream_ids, oldest_levels = stream_ids[too_old], oldest_levels[too_old]
+
+        self.slots[stream_ids, oldest_levels, :-1] = \
+            self.slots[stream_ids, oldest_levels, 1:]
+        self.counts[stream_ids, oldest_levels] -= 1
+
+    def _add_buckets(self, stream_ids):
+        """Adds a bucket of size 1 to the streams and merges if needed."""
+        timestamps = self.timestamps[stream_ids]
+
+        for size_exp in range(self.num_levels):
+            counts = self.counts[stream_ids, size_exp]
+            self.slots[stream_ids, size_exp, counts] = timestamps
+            self.counts[stream_ids, size_exp] = counts + 1
+
+            needs_merge = counts >= self.r
+            if not needs_merge.any():
+                return
+
+            # merge oldest two of the same size, keeping the newer timestamp
+            stream_ids = stream_ids[needs_merge]
+            timestamps = self.slots[stream_ids, size_exp, 1]
+            self.slots[stream_ids, size_exp, :-2] = \
+                self.slots[stream_ids, size_exp, 2:]
+            self.counts[stream_ids, size_exp] -= 2
+
+
+def handle_line(dgim, line):
+    """
+    Handles a line of DGIM input.
+
+    :param dgim: the DGIM or DGIMSum instance to use
+    :param line: a "q k" query, a string of stream bits (DGIM) or
+                 whitespace-separated stream integers (DGIMSum)
+    :return: the number of ones (or the sum) of the last k stream elements
+             for a query, else None
+    :raises ValueError: if the line is malformed, leaving dgim unchanged
+    """
+    if line.startswith('q'):
+        command, query_window_size = line.split()
+        if command != 'q':
+            raise ValueError(f'Unknown command {command}')
 
-            i = self._merge_index()
+        if isinstance(dgim, DGIMSum):
+            return dgim.count_sum(int(query_window_size))
+
+        return dgim.count_ones(int(query_window_size))
+
+    if isinstance(dgim, DGIMSum):
+        dgim.update_many(np.array(line.split(), dtype=np.int64))
+    else:
+        dgim.update_many(line)
+
+
+def load_snapshot(path):
+    """
+    Restores a DGIM or DGIMSum instance from a snapshot file.
+
+    :param path: the path of a file written by save_snapshot
+    :return: the restored instance
+    """
+    with open(path, 'rb') as f:
+        data = f.read()
+
+    if data[:4] == DGIMSum.SNAPSHOT_MAGIC:
+        return DGIMSum.from_snapshot(data)
+
+    return DGIM.from_snapshot(data)
+
+
+def save_snapshot(dgim, path):
+    """
+    Writes the snapshot of a DGIM or DGIMSum instance to a file.
+
+    The snapshot is written to a temporary file first, so an interrupted
+    write never replaces the previous snapshot.
+    """
+    temp_path = f'{path}.tmp'
+
+    with open(temp_path, 'wb') as f:
+        f.write(dgim.snapshot())
+
+    os.replace(temp_path, path)
+
+
+@contextmanager
+def deferred_signals():
+    """Delays SIGINT and SIGTERM until the enclosed block is done."""
+    signals = {signal.SIGINT, signal.SIGTERM}
+    previous_mask = signal.pthread_sigmask(signal.SIG_BLOCK, signals)
+
+    try:
+        yield
+    finally:
+        signal.pthread_sigmask(signal.SIG_SETMASK, previous_mask)
 
 
 if __name__ == '__main__':
-    window_size = int(sys.stdin.readline().rstrip())
-    dgim = DGIM(window_size)
+    parser = argparse.ArgumentParser(
+        description='Counts ones in a bit stream (or sums an integer '
+                    'stream) with DGIM.')
+    queryserver.add_serve_argument(parser)
+    parser.add_argument('--sum', type=int, metavar='NUM_BITS',
+                        help='the stream lines hold whitespace-separated '
+                             'integers of at most NUM_BITS bits and queries '
+                             'estimate their sum')
+    parser.add_argument('--snapshot', metavar='PATH',
+                        help='restore the state from PATH if it exists (the '
+                             'input then has no window size line) and save '
+                             'it there at the end of input or on SIGTERM')
+    args = parser.parse_args()
+
+    # answers are written as soon as a block of input has been handled
+    reader, writer = stream_stdin(), stdout()
+
+    if args.snapshot is not None and os.path.exists(args.snapshot):
+        dgim = load_snapshot(args.snapshot)
+
+        if (args.sum is not None) != isinstance(dgim, DGIMSum):
+            parser.error('--sum does not match the snapshot')
+    else:
+        window_size = int(reader.readline())
+        dgim = (DGIM(window_size) if args.sum is None
+                else DGIMSum(window_size, args.sum))
+
+    # SIGTERM exits like SIGINT, so the snapshot below is still saved, and
+    # a signal must not stop an update halfway through a snapshotted state
+    signal.signal(signal.SIGTERM, lambda signum, frame: sys.exit(0))
+    guard = deferred_signals if args.snapshot is not None else nullcontext
+
+    try:
+        while True:
+            line = reader.readline().rstrip()
+            if not line:
+                break
 
-    while True:
-        line = sys.stdin.readline().rstrip()
-        if not line:
-            break
+            with guard():
+                result = handle_line(dgim, line)
 
-        if line.startswith('q'):
-            query_window_size = int(line[2:])
-            print(dgim.count_ones(query_window_size))
+            if result is not None:
+                writer.print(result)
 
-        else:
-            for bit in line:
-                dgim.update(int(bit))
+        if args.serve is not None:
+            # the stream continues with the lines sent to the server
+            writer.flush()
+            queryserver.serve(lambda line: handle_line(dgim, line),
+                              args.serve)
+    finally:
+        if args.snapshot is not None:
+            save_snapshot(dgim, args.snapshot)